@@ -15,11 +15,42 @@ import os
 from dotenv import load_dotenv
 from PyPDF2 import PdfReader
 import google.generativeai as genai
-from groq import Groq
+from groq import Groq, AsyncGroq
 import docx2txt
-from datetime import datetime
+from datetime import datetime, timedelta
+from collections import namedtuple
 import re
 import logging
+import gzip
+import json
+import hashlib
+import threading
+import time
+import uuid
+import contextvars
+import asyncio
+from contextlib import contextmanager
+from abc import ABC, abstractmethod
+import csv
+import difflib
+import cProfile
+import pstats
+import marshal
+import io
+import zipfile
+import sqlite3
+import sys
+import math
+import random
+import itertools
+from collections import OrderedDict, Counter, deque
+from concurrent.futures import (ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeoutError,
+    CancelledError as FutureCancelledError)
+from xml.sax.saxutils import escape as xml_escape
+try:
+    from fpdf import FPDF
+except ImportError:  # PDF export is offered only when fpdf2 is installed
+    FPDF = None
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -28,6 +59,15 @@ logger = logging.getLogger(__name__)
 # Load environment variables from .env file (local development)
 load_dotenv()
 
+def get_config(key, default=None):
+    """Read a setting from Streamlit secrets, falling back to environment variables"""
+    try:
+        if key in st.secrets:
+            return st.secrets[key]
+    except Exception:
+        pass
+    return os.getenv(key, default)
+
 # Get API keys
 if 'Google_Gemini_ai_key' in st.secrets:
     gemini_api_key = st.secrets['Google_Gemini_ai_key']
@@ -59,356 +99,2041 @@ except Exception as e:
     st.warning("⚠️ Error initializing Groq client. Some features may be limited.")
     groq_client = None
 
-class ATSAnalyzer:
-    # Language prompts dictionary
-    LANGUAGE_PROMPTS = {
-        "English": {
-            "resume_analysis": """
-Analyze the resume and provide:
-1. Match Score (%)
-2. Key Strengths
-3. Missing Skills
-4. Improvement Suggestions
-            """,
-            "labels": {
-                "upload": "Upload your resume (PDF or DOC/DOCX format)",
-                "job_desc": "Job Description",
-                "analyze": "Analyze Resume",
-                "results": "Analysis Results"
-            }
-        },
-        "हिंदी": {
-            "resume_analysis": """
-रिज्यूमे का विश्लेषण करें और प्रदान करें:
-1. मैच स्कोर (%)
-2. प्रमुख शक्तियां
-3. कमी वाले कौशल
-4. सुधार के सुझाव
-            """,
-            "labels": {
-                "upload": "अपना रिज्यूमे अपलोड करें (PDF या DOC/DOCX प्रारूप)",
-                "job_desc": "नौकरी का विवरण",
-                "analyze": "रिज्यूमे का विश्लेषण करें",
-                "results": "विश्लेषण परिणाम"
-            }},
-        "తెలుగు": {
-            "resume_analysis": """
-రెస్యూమ్ విశ్లేషణ చేసి ఈ క్రింది వాటిని అందించండి:
-1. మ్యాచ్ స్కోర్ (%)
-2. ముఖ్య బలాలు
-3. కొరవడిన నైపుణ్యాలు
-4. మెరుగుదల సూచనలు
-            """,
-            "labels": {
-                "upload": "మీ రెస్యూమ్‌ని అప్‌లోడ్ చేయండి (PDF లేదా DOC/DOCX ఫార్మాట్)",
-                "job_desc": "ఉద్యోగ వివరణ",
-                "analyze": "రెస్యూమ్ విశ్లేషించండి",
-                "results": "విశ్లేషణ ఫలితాలు"
-            }}}
-
-    # Analysis types with their prompts
-    ANALYSIS_TYPES = {
-        "Complete Analysis": """Analyze my resume against the provided job description(s) and provide a comprehensive evaluation, including:
-1.Overall Match Score (0 to 100): Calculate the candidate's overall suitability (%). Explain the weighting of Key Skills, Experience, and Education.
-
-2.Key Skills Match:
-Matching: List proficient skills.
-Potential: List skills needing assessment.
-Missing: List crucial missing skills.
-
-3.Experience Alignment:
-Relevant: Detail correlating experience, quantifying achievements.
-Transferable: Identify applicable skills from other roles.
-Gaps: Note experience gaps.
-
-4.Education Fit:
-Required: State minimum qualifications.
-Candidate's: List degrees, certifications, coursework.
-Gaps: Identify education discrepancies.
-Improvement Suggestions: Offer constructive feedback for strengthening their profile.
-        """,
-         "ATS Optimization": """
-I need you to act as an expert resume writer and optimization specialist. Your ultimate goal is to create a powerful and highly effective resume for me that excels in all aspects: ATS compatibility, recruiter appeal, and alignment with industry best practices.
-
-1.ATS Compatibility Analysis:Thoroughly review my resume for any elements that might hinder its performance in ATS scans.  Identify specific areas for improvement, including:Formatting issues (e.g., use of tables, images, special characters, unusual fonts)
-File format (recommend the most ATS-friendly format)
-Keyword optimization (lack of relevant keywords, keyword stuffing)
-Section headings and organization (ensure logical structure and standard headings)
-Date formats and other data inconsistencies
-
-2.Content Enhancement for Recruiter Appeal:  Suggest specific changes to better highlight my technical skills, projects, and achievements.  Focus on making these elements stand out to recruiters:
-Quantifiable achievements:Help me rephrase accomplishments to showcase quantifiable results (e.g., "Increased sales by 15%" instead of "Increased sales").
-Project descriptions: Advise on how to write concise and compelling project descriptions that emphasize my contributions and the project's impact.
-Technical skills: Ensure my technical skills are prominently displayed and categorized effectively. Suggest ways to showcase proficiency levels (e.g., beginner, intermediate, expert).
-Impactful language: Help me use action verbs and strong language to make my resume more dynamic and engaging.
-
-3.Industry Alignment and Tailoring: Provide recommendations on how to tailor my resume language and structure to align with common industry standards and specific job descriptions.
-This includes Keyword matching:Explain how to identify and incorporate relevant keywords from job descriptions.
-Industry-specific terminology: Suggest appropriate terminology and jargon to use.
-
-4.Resume length and format: Advise on the ideal length and format for my industry and experience level.
-        """,
-        "Skills Gap Analysis": """
-        Provide a concise skills analysis for the candidate, focusing on the following areas:
-1.Matching Skills: List the candidate's skills that directly align with the job requirements, quantifying their proficiency where possible.
-2.Missing Critical Skills: List the essential skills required for the role that the candidate lacks, prioritizing them based on their importance to job performance.
-3.Recommended Skills to Add: List skills that would significantly enhance the candidate's suitability for the role or their future growth within the company, explaining the rationale behind each recommendation.
-4.Skill Level Assessment: Provide a qualitative assessment of the candidate's skill level for each matching skill using terms like Beginner, Intermediate, Proficient, and Expert.
-        """,
-        "Quick Summary": """
-Provide a brief overview:
-1.Match: Overall suitability (%). Weighting of criteria (e.g., skills, experience, education).
-2.Strengths: Top 3, with examples.
-3.Gaps: Top 3, prioritized.
-4.Next Steps: 2-3 recommendations.
-        """}
+# Provider reply returned by every SDK call (text, token usage and observed latency in seconds)
+ProviderReply = namedtuple("ProviderReply", ["text", "usage", "latency"])
 
-    # AI models
-    AI_MODELS = {"Google Gemini": "🤖 Google Gemini (High accurate and reliable)","Groq": "🤖 Groq (Fast but moderately accurate)"}
+class CassetteMissError(Exception):
+    """Raised in replay mode when a request was never recorded"""
 
-    # Cold mail 
-    COLD_MAIL_TYPES = {
-        "📑 Professional and Straightforward": {
-            "description": "A formal and direct approach, ideal for traditional industries and corporate settings",
-            "template": """
-Subject: Seeking Internship Opportunity to Learn and Contribute
+class ProviderCassette:
+    """Record provider request/response pairs to a cassette file and replay them offline"""
 
-Dear [Recipient's Name],
+    MODES = ("off", "record", "replay")
 
-I hope you're doing well. My name is [Your Name], and I am currently a [Your Year] student pursuing [Your Degree] at [Your College/University Name].
+    def __init__(self, mode="off", path="cassettes/provider_calls.jsonl.gz", latency_scale=1.0):
+        self.mode = mode if mode in self.MODES else "off"
+        self.path = path
+        self.latency_scale = latency_scale
+        self.entries = {}
+        self.positions = {}
+        self.stats = {"recorded": 0, "replayed": 0, "misses": 0, "recorded_latency": 0.0, "replayed_latency": 0.0}
+        self._lock = threading.Lock()
+        if self.mode == "replay":
+            self.load()
 
-I am writing to express my interest in an internship opportunity at [Company Name]. I have been following your company's work in [specific field/area], and I am truly inspired by your innovative contributions to the industry.
+    @property
+    def replaying(self):
+        return self.mode == "replay"
 
-My academic background and hands-on experience in [specific skills/tools] have prepared me to contribute meaningfully to your team. I am eager to learn from industry experts like you and enhance my skills further.
+    @staticmethod
+    def request_key(provider, model, payload):
+        """Stable hash of a provider request"""
+        canonical = json.dumps([provider, model, payload], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def load(self):
+        """Load all recorded entries, keeping repeated requests in recorded order"""
+        self.entries = {}
+        self.positions = {}
+        if not os.path.exists(self.path):
+            logger.warning(f"Cassette file not found: {self.path}")
+            return
+        with gzip.open(self.path, "rt", encoding="utf-8") as cassette_file:
+            for line in cassette_file:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.entries.setdefault(entry["key"], []).append(entry)
+        logger.debug(f"Loaded {sum(len(v) for v in self.entries.values())} cassette entries from {self.path}")
+
+    def record(self, key, provider, model, payload, reply):
+        """Append one request/response pair to the cassette"""
+        entry = {"key": key, "provider": provider, "model": model, "request": payload,
+            "text": reply.text, "usage": reply.usage, "latency": round(reply.latency, 4),
+            "recorded_at": datetime.now().isoformat(timespec="seconds")}
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Appending creates a new gzip member, which gzip.open reads back transparently
+            with gzip.open(self.path, "at", encoding="utf-8") as cassette_file:
+                cassette_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.stats["recorded"] += 1
+            self.stats["recorded_latency"] += reply.latency
+
+    def replay(self, key):
+        """Serve a recorded reply, sleeping for the recorded latency times the scale"""
+        with self._lock:
+            recorded = self.entries.get(key)
+            if not recorded:
+                self.stats["misses"] += 1
+                raise CassetteMissError(f"No recorded response for request {key[:12]}")
+            position = self.positions.get(key, 0)
+            entry = recorded[position % len(recorded)]
+            self.positions[key] = position + 1
+        delay = entry["latency"] * self.latency_scale
+        if delay > 0:
+            time.sleep(delay)
+        with self._lock:
+            self.stats["replayed"] += 1
+            self.stats["replayed_latency"] += delay
+        return ProviderReply(entry["text"], entry.get("usage"), delay)
+
+    def call(self, provider, model, payload, live_call):
+        """Route a provider request through the cassette; live_call returns (text, usage)"""
+        key = self.request_key(provider, model, payload)
+        if self.mode == "replay":
+            return self.replay(key)
+        start = time.perf_counter()
+        text, usage = live_call()
+        reply = ProviderReply(text, usage, time.perf_counter() - start)
+        if self.mode == "record":
+            try:
+                self.record(key, provider, model, payload, reply)
+            except Exception as e:
+                logger.error(f"Error recording cassette entry: {str(e)}")
+        return reply
+
+@st.cache_resource
+def get_provider_cassette():
+    """Process-wide cassette configured from SJA_CASSETTE_* settings"""
+    return ProviderCassette(
+        mode=str(get_config("SJA_CASSETTE_MODE", "off")).lower(),
+        path=get_config("SJA_CASSETTE_PATH", "cassettes/provider_calls.jsonl.gz"),
+        latency_scale=float(get_config("SJA_CASSETTE_LATENCY_SCALE", 1.0)))
+
+provider_cassette = get_provider_cassette()
+if provider_cassette.mode != "off":
+    st.info(f"📼 Provider cassette in {provider_cassette.mode} mode ({provider_cassette.path})")
+
+@st.cache_resource
+def get_job_cancelled_error():
+    """Process-wide exception class: the cached provider loop and job queue raise and catch the class defined by
+    the first script run, so every later run must use that same class"""
+    class JobCancelledError(Exception):
+        """Raised inside a job whose owner cancelled it while it was running"""
+    return JobCancelledError
+
+JobCancelledError = get_job_cancelled_error()
+
+class CancelToken:
+    """Cancellation signal for one job, cancelling the provider calls it has in flight"""
+
+    def __init__(self):
+        self.cancelled = False
+        self.futures = set()
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            futures = list(self.futures)
+        for future in futures:
+            future.cancel()
+
+    def track(self, future):
+        """Register an in-flight provider call; False (after cancelling it) when the job is already cancelled"""
+        with self._lock:
+            if not self.cancelled:
+                self.futures.add(future)
+                return True
+        future.cancel()
+        return False
+
+    def untrack(self, future):
+        with self._lock:
+            self.futures.discard(future)
+
+@st.cache_resource
+def get_cancel_context():
+    """Process-wide context variable holding the running job's cancel token"""
+    return contextvars.ContextVar("cancel_token", default=None)
+
+cancel_context = get_cancel_context()
+
+class AsyncProviderLoop:
+    """Process-wide asyncio event loop on a daemon thread that runs the async provider clients"""
+
+    def __init__(self, timeout=120, max_in_flight=16):
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        self.loop = asyncio.new_event_loop()
+        self.stats = {"calls": 0, "in_flight": 0, "peak_in_flight": 0, "timeouts": 0, "cancelled": 0}
+        self._semaphore = None
+        self._groq_client = None
+        self.thread = threading.Thread(target=self.loop.run_forever, name="sja-provider-loop", daemon=True)
+        self.thread.start()
+
+    @property
+    def groq_client(self):
+        """Async Groq client, created on first use"""
+        if self._groq_client is None and groq_api_key:
+            self._groq_client = AsyncGroq(api_key=groq_api_key)
+        return self._groq_client
+
+    async def guarded(self, coro):
+        """Await a provider coroutine under the in-flight limit and the provider timeout"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        async with self._semaphore:
+            self.stats["calls"] += 1
+            self.stats["in_flight"] += 1
+            self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.stats["in_flight"])
+            try:
+                return await asyncio.wait_for(coro, self.timeout)
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                raise TimeoutError(f"Provider call timed out after {self.timeout:g}s")
+            except asyncio.CancelledError:
+                self.stats["cancelled"] += 1
+                raise
+            finally:
+                self.stats["in_flight"] -= 1
+
+    def submit(self, coro):
+        """Schedule a provider coroutine on the loop and return a concurrent future"""
+        return asyncio.run_coroutine_threadsafe(self.guarded(coro), self.loop)
+
+    def run(self, coro):
+        """Sync facade: block the calling thread until the coroutine finishes, cancelling it on timeout or when
+        the calling job is cancelled"""
+        cancel_token = cancel_context.get()
+        if cancel_token is not None and cancel_token.cancelled:
+            coro.close()
+            raise JobCancelledError("The request was cancelled")
+        future = self.submit(coro)
+        if cancel_token is not None and not cancel_token.track(future):
+            raise JobCancelledError("The request was cancelled")
+        try:
+            # The loop enforces the timeout itself; the extra margin covers time spent waiting for a slot
+            return future.result(self.timeout * 2)
+        except FutureCancelledError:
+            raise JobCancelledError("The request was cancelled")
+        except FutureTimeoutError:
+            if future.done():
+                raise
+            future.cancel()
+            raise TimeoutError(f"Provider call did not finish within {self.timeout * 2:g}s")
+        finally:
+            if cancel_token is not None:
+                cancel_token.untrack(future)
+
+@st.cache_resource
+def get_provider_loop():
+    """Process-wide provider event loop configured from SJA_PROVIDER_* settings"""
+    return AsyncProviderLoop(timeout=float(get_config("SJA_PROVIDER_TIMEOUT", 120)),
+        max_in_flight=int(get_config("SJA_PROVIDER_MAX_IN_FLIGHT", 16)))
+
+provider_loop = get_provider_loop()
+
+class PromptPrefixCache:
+    """Track reuse of shared prompt prefixes (system message, resume, JD) and hold provider cache handles"""
+
+    def __init__(self, ttl_seconds=3600, max_entries=64):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries = {}
+        self.stats = {"hits": 0, "misses": 0, "reused_chars": 0, "provider_cached": 0}
+        self._lock = threading.Lock()
+
+    def lookup(self, prefix):
+        """Return the entry for a prefix, counting a hit when it was seen before and has not expired"""
+        key = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+        now = time.time()
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry and entry["expires"] > now:
+                entry["hits"] += 1
+                self.stats["hits"] += 1
+                self.stats["reused_chars"] += len(prefix)
+            else:
+                entry = {"key": key, "hits": 0, "chars": len(prefix), "handle": None,
+                    "uncacheable": False, "expires": now + self.ttl_seconds}
+                self.entries[key] = entry
+                self.stats["misses"] += 1
+                while len(self.entries) > self.max_entries:
+                    self.entries.pop(next(iter(self.entries)))
+            return entry
+
+    @property
+    def hit_rate(self):
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
+
+@st.cache_resource
+def get_prompt_prefix_cache():
+    """Process-wide prompt prefix cache configured from SJA_PREFIX_CACHE_TTL"""
+    return PromptPrefixCache(ttl_seconds=int(get_config("SJA_PREFIX_CACHE_TTL", 3600)))
+
+prompt_prefix_cache = get_prompt_prefix_cache()
+
+class RateLimiter:
+    """Token bucket limiting how many provider requests may start per minute"""
+
+    def __init__(self, rate_per_minute=30, burst=3):
+        self.interval = 60.0 / max(rate_per_minute, 1)
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may start"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.interval)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) * self.interval
+            time.sleep(wait)
+
+@st.cache_resource
+def get_bulk_rate_limiter():
+    """Process-wide limiter shared by all bulk cold mail runs"""
+    return RateLimiter(rate_per_minute=int(get_config("SJA_BULK_RATE_PER_MIN", 30)))
+
+@st.cache_resource
+def get_queue_full_error():
+    """Process-wide exception class: the cached job queue raises the class defined by the first script run, so
+    every later run must catch that same class"""
+    class QueueFullError(Exception):
+        """Raised when the job queue sheds a new job instead of letting the backlog grow"""
+    return QueueFullError
+
+QueueFullError = get_queue_full_error()
+
+class JobQueue:
+    """Process-wide worker pool that runs provider calls outside the Streamlit script thread, serving sessions fairly"""
+
+    def __init__(self, max_workers=8, ttl_seconds=3600, max_jobs=1000, max_queued=200, max_queued_per_session=10,
+            max_wait=180):
+        self.max_workers = max_workers
+        self.ttl_seconds = ttl_seconds
+        self.max_jobs = max_jobs
+        self.max_queued = max_queued
+        self.max_queued_per_session = max_queued_per_session
+        self.max_wait = max_wait
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sja-job")
+        self.jobs = {}
+        # Queued job ids per session; workers take the head of the first session, which then moves to the back
+        self.queues = OrderedDict()
+        self.busy_seconds = 0.0
+        self.average_seconds = None
+        self.shed = 0
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def submit(self, label, fn, *args, progress=False, session=None, **kwargs):
+        """Queue fn(*args, **kwargs) in the session's fair-queue lane (the accounting session by default) and return
+        its job id; with progress=True fn also receives report(fraction, text)"""
+        job_id = uuid.uuid4().hex
+        job = {"id": job_id, "label": label, "status": "queued", "progress": 0.0, "progress_text": "",
+            "result": None, "error": None, "submitted": time.time(), "started": None, "finished": None,
+            "cancel_token": CancelToken()}
+        # Accounting dimensions (e.g. the session) follow the job; the rest of the script's context must not,
+        # as Streamlit would then treat the worker as the script thread
+        dimensions = accounting_context.get()
+        if session is not None:
+            dimensions = {**dimensions, "session": session}
+        session = dimensions.get("session", "")
+        with self._lock:
+            self.admit(session)
+            self.prune()
+            self.jobs[job_id] = job
+            self.queues.setdefault(session, deque()).append(job_id)
+
+        def report(fraction, text=""):
+            job["progress"], job["progress_text"] = max(0.0, min(1.0, fraction)), text
+
+        def run():
+            job["status"], job["started"] = "running", time.time()
+            cancel_scope = cancel_context.set(job["cancel_token"])
+            try:
+                with accounting_scope(**dimensions):
+                    job["result"] = fn(*args, report=report, **kwargs) if progress else fn(*args, **kwargs)
+                job["status"] = "done"
+            except JobCancelledError:
+                logger.info(f"Background job '{label}' was cancelled while running")
+                job["status"] = "cancelled"
+            except Exception as e:
+                logger.error(f"Background job '{label}' failed: {str(e)}")
+                job["error"], job["status"] = str(e), "failed"
+            finally:
+                cancel_context.reset(cancel_scope)
+                job["finished"], job["progress"] = time.time(), 1.0
+                duration = job["finished"] - job["started"]
+                with self._lock:
+                    self.busy_seconds += duration
+                    self.average_seconds = duration if self.average_seconds is None else (
+                        0.8 * self.average_seconds + 0.2 * duration)
+
+        job["run"] = run
+        # One worker task per job, but each task runs whichever job is next in the round-robin order
+        self.executor.submit(self.run_next)
+        return job_id
+
+    def admit(self, session):
+        """Shed a new job early, while the backlog is still bounded; called with the lock held"""
+        session_queued = len(self.queues.get(session, ()))
+        if session_queued >= self.max_queued_per_session:
+            self.shed += 1
+            raise QueueFullError(f"You already have {session_queued} requests waiting. Please let them finish first.")
+        queued = sum(len(queue) for queue in self.queues.values())
+        wait = self.estimated_wait(queued + 1)
+        if queued >= self.max_queued or (self.max_wait and wait and wait > self.max_wait):
+            self.shed += 1
+            raise QueueFullError(f"The assistant is busy with {queued} waiting requests. "
+                f"Please try again in about {max(wait or 0, 30):.0f} seconds.")
+
+    def run_next(self):
+        """Run the head job of the session whose turn it is"""
+        with self._lock:
+            if not self.queues:
+                return
+            session, queue = self.queues.popitem(last=False)
+            job_id = queue.popleft()
+            if queue:
+                self.queues[session] = queue
+            run = self.jobs[job_id].pop("run")
+        run()
+
+    def position(self, job_id):
+        """1-based place of a queued job in the round-robin order, or None once it has left the queue"""
+        with self._lock:
+            queues = list(self.queues.values())
+            for index, queue in enumerate(queues):
+                if job_id in queue:
+                    depth = queue.index(job_id)
+                    # Every earlier round serves each session once; in the job's own round earlier sessions go first
+                    return 1 + depth + sum(min(len(other), depth + (other_index < index))
+                        for other_index, other in enumerate(queues) if other_index != index)
+        return None
+
+    def estimated_wait(self, position):
+        """Seconds until the job at this queue position starts, from the average job duration (None before any finish)"""
+        if self.average_seconds is None:
+            return None
+        return math.ceil(position / self.max_workers) * self.average_seconds
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def release(self, job_id):
+        """Drop a finished job's result once its session has collected it, keeping the job's status for the stats"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job and job["finished"]:
+                job["result"] = None
+
+    def cancel(self, job_id):
+        """Cancel a queued job, or stop a running one by cancelling its in-flight provider calls"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            for session, queue in self.queues.items():
+                if job_id in queue:
+                    queue.remove(job_id)
+                    if not queue:
+                        del self.queues[session]
+                    break
+            else:
+                if job is None or job["finished"]:
+                    return False
+                job["cancel_token"].cancel()
+                return True
+            job.pop("run", None)
+            job["status"], job["finished"] = "cancelled", time.time()
+        return True
+
+    def prune(self):
+        """Drop finished jobs past their TTL, and the oldest ones beyond the job limit"""
+        now = time.time()
+        for job_id in [job_id for job_id, job in self.jobs.items()
+                if job["finished"] and now - job["finished"] > self.ttl_seconds]:
+            del self.jobs[job_id]
+        while len(self.jobs) >= self.max_jobs:
+            oldest = next((job_id for job_id, job in self.jobs.items() if job["finished"]), None)
+            if oldest is None:
+                break
+            del self.jobs[oldest]
+
+    def stats(self):
+        """Queue depth and worker utilization"""
+        statuses = [job["status"] for job in list(self.jobs.values())]
+        running = statuses.count("running")
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        return {"queued": statuses.count("queued"), "running": running, "done": statuses.count("done"),
+            "failed": statuses.count("failed"), "shed": self.shed, "sessions_waiting": len(self.queues),
+            "workers": self.max_workers,
+            "utilization": running / self.max_workers,
+            "busy_ratio": min(1.0, self.busy_seconds / (elapsed * self.max_workers))}
+
+@st.cache_resource
+def get_job_queue():
+    """Process-wide job queue sized from SJA_JOB_WORKERS, shedding load past the SJA_JOB_MAX_* limits"""
+    return JobQueue(max_workers=int(get_config("SJA_JOB_WORKERS", 8)),
+        ttl_seconds=int(get_config("SJA_JOB_TTL", 3600)),
+        max_queued=int(get_config("SJA_JOB_MAX_QUEUED", 200)),
+        max_queued_per_session=int(get_config("SJA_JOB_MAX_QUEUED_PER_SESSION", 10)),
+        max_wait=float(get_config("SJA_JOB_MAX_WAIT", 180)))
+
+job_queue = get_job_queue()
+
+class SpeculativePrefetch:
+    """Start a session's most likely request in the background before it is asked for, and count how often it is"""
+
+    def __init__(self):
+        self.stats = {"started": 0, "hits": 0, "cancelled": 0}
+        self._lock = threading.Lock()
+
+    def start(self, speculation, key, label, fn, *args):
+        """Speculatively run fn(*args) for key, abandoning the session's previous speculation for other inputs"""
+        if speculation.get("key") == key:
+            return
+        self.abandon(speculation)
+        try:
+            job_id = job_queue.submit(label, fn, *args)
+        except QueueFullError:
+            # Speculation is the first load to shed; the user can still ask for the analysis explicitly
+            return
+        speculation.update(key=key, job_id=job_id, claimed=False)
+        with self._lock:
+            self.stats["started"] += 1
+
+    def abandon(self, speculation):
+        """Cancel unclaimed speculative work, stopping its provider calls if it is already running"""
+        if speculation.get("job_id") and not speculation.get("claimed") and job_queue.cancel(speculation["job_id"]):
+            with self._lock:
+                self.stats["cancelled"] += 1
+        speculation.clear()
+
+    def claim(self, speculation, key):
+        """Count a hit when the user asks for the request already speculated for this session"""
+        if speculation.get("key") != key or speculation.get("claimed"):
+            return False
+        speculation["claimed"] = True
+        with self._lock:
+            self.stats["hits"] += 1
+        return True
+
+    @property
+    def hit_rate(self):
+        return self.stats["hits"] / self.stats["started"] if self.stats["started"] else 0.0
+
+@st.cache_resource
+def get_speculative_prefetch():
+    """Process-wide speculative prefetch statistics"""
+    return SpeculativePrefetch()
+
+speculative_prefetch = get_speculative_prefetch()
+
+class NearDuplicateIndex:
+    """MinHash signatures of resume and job description pairs, bucketed with LSH so near-duplicates are found in sublinear time"""
+
+    BULLET_PATTERN = re.compile(r"[•·▪●◦■►✓*–—-]+")
+    WORD_PATTERN = re.compile(r"\w+")
+    PRIME = (1 << 31) - 1
+
+    def __init__(self, threshold=0.9, num_perm=64, bands=16, shingle_size=3, max_entries=2000):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.max_entries = max_entries
+        # Fixed seed so the same text always gets the same signature
+        generator = random.Random(20240601)
+        self.permutations = [(generator.randrange(1, self.PRIME), generator.randrange(0, self.PRIME))
+            for _ in range(num_perm)]
+        self.entries = OrderedDict()
+        self.buckets = {}
+        self.stats = {"lookups": 0, "hits": 0, "evictions": 0}
+        self._lock = threading.Lock()
+
+    def signature(self, text):
+        """MinHash signature of a text's word shingles after dropping case, bullets and punctuation"""
+        words = self.WORD_PATTERN.findall(self.BULLET_PATTERN.sub(" ", (text or "").lower()))
+        shingles = {" ".join(words[start:start + self.shingle_size])
+            for start in range(max(1, len(words) - self.shingle_size + 1))}
+        hashes = [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "big")
+            for shingle in shingles]
+        return tuple(min((a * value + b) % self.PRIME for value in hashes) for a, b in self.permutations)
+
+    def fingerprint(self, resume_text, job_description):
+        """Signatures and exact hashes of a request's resume and job description"""
+        # The exact hash covers the raw texts, like the provider response cache key: texts differing only in
+        # whitespace miss that cache, so they must still be found here
+        exact = hashlib.sha256(json.dumps([resume_text, job_description], ensure_ascii=False).encode("utf-8"))
+        return {"resume": self.signature(resume_text), "job_description": self.signature(job_description),
+            "exact": exact.hexdigest(), "resume_hash": ATSAnalyzer.request_fingerprint("resume", resume_text)}
 
-Could we connect to discuss any available internship opportunities? I have attached my resume for your review and would be happy to provide additional information if needed. Thank you for considering my application. I look forward to the possibility of contributing to your team.
+    @staticmethod
+    def similarity(first, second):
+        """Estimated Jaccard similarity of two signatures"""
+        return sum(a == b for a, b in zip(first, second)) / len(first)
+
+    def band_keys(self, scope, fingerprint):
+        # Bands cover both texts, so a candidate must share a band of the resume or of the job description
+        signature = fingerprint["resume"] + fingerprint["job_description"]
+        return [(scope, band, signature[band * self.rows:(band + 1) * self.rows])
+            for band in range(len(signature) // self.rows)]
+
+    def lookup(self, scope, fingerprint, session=None):
+        """Most similar stored response whose resume and job description are both above the threshold, as
+        (response, similarity), or None; exact repeats are left to the exact-match caches, and the session's own
+        earlier resume versions are never reused, since comparing versions is the point of re-analyzing them"""
+        with self._lock:
+            self.stats["lookups"] += 1
+            candidates = set()
+            for key in self.band_keys(scope, fingerprint):
+                candidates.update(self.buckets.get(key, ()))
+            best, best_similarity = None, 0.0
+            for entry_id in candidates:
+                entry = self.entries[entry_id]
+                if entry["fingerprint"]["exact"] == fingerprint["exact"]:
+                    continue
+                if session and entry["session"] == session and (
+                        entry["fingerprint"]["resume_hash"] != fingerprint["resume_hash"]):
+                    continue
+                similarity = min(self.similarity(entry["fingerprint"]["resume"], fingerprint["resume"]),
+                    self.similarity(entry["fingerprint"]["job_description"], fingerprint["job_description"]))
+                if similarity >= self.threshold and similarity > best_similarity:
+                    best, best_similarity = entry_id, similarity
+            if best is None:
+                return None
+            self.entries.move_to_end(best)
+            self.stats["hits"] += 1
+            return self.entries[best]["response"], best_similarity
+
+    def add(self, scope, fingerprint, response, session=None):
+        """Store a fresh response for the session that asked for it, evicting the least recently used entries
+        beyond max_entries"""
+        entry_id = (scope, fingerprint["exact"])
+        with self._lock:
+            if entry_id in self.entries:
+                self.entries.move_to_end(entry_id)
+                return
+            self.entries[entry_id] = {"scope": scope, "fingerprint": fingerprint, "response": response,
+                "session": session}
+            for key in self.band_keys(scope, fingerprint):
+                self.buckets.setdefault(key, set()).add(entry_id)
+            while len(self.entries) > self.max_entries:
+                evicted_id, evicted = self.entries.popitem(last=False)
+                for key in self.band_keys(evicted["scope"], evicted["fingerprint"]):
+                    bucket = self.buckets.get(key)
+                    if bucket is not None:
+                        bucket.discard(evicted_id)
+                        if not bucket:
+                            del self.buckets[key]
+                self.stats["evictions"] += 1
+
+    @property
+    def hit_rate(self):
+        return self.stats["hits"] / self.stats["lookups"] if self.stats["lookups"] else 0.0
+
+@st.cache_resource
+def get_near_duplicate_index():
+    """Process-wide near-duplicate index; SJA_NEAR_DUPLICATE_THRESHOLD of 0 turns reuse off"""
+    return NearDuplicateIndex(threshold=float(get_config("SJA_NEAR_DUPLICATE_THRESHOLD", 0.9)),
+        max_entries=int(get_config("SJA_NEAR_DUPLICATE_MAX_ENTRIES", 2000)))
+
+near_duplicates = get_near_duplicate_index()
+
+class CacheBackend(ABC):
+    """Namespaced key/value cache with per-namespace TTLs, shared by extraction, LLM responses and scores"""
+
+    DEFAULT_TTLS = {"extract": 7 * 24 * 3600, "llm": 24 * 3600, "score": 24 * 3600, "chunk": 24 * 3600}
+
+    def __init__(self, max_entries=5000, ttls=None):
+        self.max_entries = max_entries
+        self.ttls = {**self.DEFAULT_TTLS, **(ttls or {})}
+        self.stats = {}
+        self._stats_lock = threading.Lock()
+
+    def count(self, namespace, outcome, amount=1):
+        with self._stats_lock:
+            namespace_stats = self.stats.setdefault(namespace, {"hits": 0, "misses": 0, "sets": 0, "evictions": 0})
+            namespace_stats[outcome] += amount
+
+    def hit_rate(self, namespace):
+        namespace_stats = self.stats.get(namespace, {})
+        total = namespace_stats.get("hits", 0) + namespace_stats.get("misses", 0)
+        return namespace_stats.get("hits", 0) / total if total else 0.0
+
+    def expiry(self, namespace, ttl=None):
+        ttl = self.ttls.get(namespace, 3600) if ttl is None else ttl
+        return time.time() + ttl
+
+    @abstractmethod
+    def get(self, namespace, key):
+        """Value stored under key, or None when it is missing or expired"""
+
+    @abstractmethod
+    def set(self, namespace, key, value, ttl=None):
+        """Store value under key for ttl seconds (the namespace TTL by default)"""
+
+    @abstractmethod
+    def delete(self, namespace, key):
+        """Remove one entry"""
+
+    @abstractmethod
+    def clear(self, namespace=None):
+        """Remove every entry of a namespace, or of all namespaces"""
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU cache, private to one replica"""
+
+    def __init__(self, max_entries=5000, ttls=None):
+        super().__init__(max_entries, ttls)
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, namespace, key):
+        with self._lock:
+            entry = self.entries.get((namespace, key))
+            if entry and entry[1] > time.time():
+                self.entries.move_to_end((namespace, key))
+                value = entry[0]
+            else:
+                self.entries.pop((namespace, key), None)
+                value = None
+        self.count(namespace, "hits" if value is not None else "misses")
+        return value
+
+    def set(self, namespace, key, value, ttl=None):
+        with self._lock:
+            self.entries[(namespace, key)] = (value, self.expiry(namespace, ttl))
+            self.entries.move_to_end((namespace, key))
+            evicted = Counter()
+            while len(self.entries) > self.max_entries:
+                (evicted_namespace, _), _ = self.entries.popitem(last=False)
+                evicted[evicted_namespace] += 1
+        self.count(namespace, "sets")
+        for evicted_namespace, amount in evicted.items():
+            self.count(evicted_namespace, "evictions", amount)
+
+    def delete(self, namespace, key):
+        with self._lock:
+            self.entries.pop((namespace, key), None)
+
+    def clear(self, namespace=None):
+        with self._lock:
+            for cache_key in [cache_key for cache_key in self.entries if namespace in (None, cache_key[0])]:
+                del self.entries[cache_key]
+
+class SQLiteCacheBackend(CacheBackend):
+    """Cache in a SQLite file in WAL mode, shared by every replica that mounts the same path"""
+
+    # Access times for the LRU order are written in batches, so cache hits do not each take the write lock
+    ACCESS_FLUSH_SIZE = 64
+    ACCESS_FLUSH_SECONDS = 30
+
+    def __init__(self, path="cache/sja_cache.sqlite3", max_entries=5000, ttls=None):
+        super().__init__(max_entries, ttls)
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sets_since_eviction = 0
+        self._pending_access = {}
+        self._last_access_flush = time.time()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = self.connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("""CREATE TABLE IF NOT EXISTS cache (
+            namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,
+            expires REAL NOT NULL, accessed REAL NOT NULL, PRIMARY KEY (namespace, key))""")
+        connection.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+        connection.commit()
+
+    def connection(self):
+        """One connection per thread, as sqlite3 connections must not be shared across threads"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, namespace, key):
+        connection = self.connection()
+        now = time.time()
+        row = connection.execute("SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires > ?",
+            (namespace, key, now)).fetchone()
+        if row:
+            self.note_access(namespace, key, now)
+        self.count(namespace, "hits" if row else "misses")
+        return json.loads(row[0]) if row else None
+
+    def note_access(self, namespace, key, accessed):
+        """Queue an access-time update, writing the queue once it is large or old enough"""
+        with self._lock:
+            self._pending_access[(namespace, key)] = accessed
+            due = (len(self._pending_access) >= self.ACCESS_FLUSH_SIZE
+                or accessed - self._last_access_flush >= self.ACCESS_FLUSH_SECONDS)
+        if due:
+            self.flush_access()
+
+    def flush_access(self):
+        """Write the queued access times in one transaction"""
+        with self._lock:
+            pending, self._pending_access = self._pending_access, {}
+            self._last_access_flush = time.time()
+        if pending:
+            connection = self.connection()
+            connection.executemany("UPDATE cache SET accessed = ? WHERE namespace = ? AND key = ?",
+                [(accessed, namespace, key) for (namespace, key), accessed in pending.items()])
+            connection.commit()
+
+    def set(self, namespace, key, value, ttl=None):
+        connection = self.connection()
+        connection.execute("INSERT OR REPLACE INTO cache (namespace, key, value, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+            (namespace, key, json.dumps(value, ensure_ascii=False), self.expiry(namespace, ttl), time.time()))
+        connection.commit()
+        self.count(namespace, "sets")
+        with self._lock:
+            self._sets_since_eviction += 1
+            due = self._sets_since_eviction >= 100
+        if due:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used ones beyond max_entries"""
+        with self._lock:
+            self._sets_since_eviction = 0
+        # The LRU order must include the accesses still queued in this process
+        self.flush_access()
+        connection = self.connection()
+        connection.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+        excess = connection.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            evicted = connection.execute("SELECT rowid, namespace FROM cache ORDER BY accessed LIMIT ?",
+                (excess,)).fetchall()
+            connection.executemany("DELETE FROM cache WHERE rowid = ?", [(rowid,) for rowid, _ in evicted])
+            for namespace, amount in Counter(namespace for _, namespace in evicted).items():
+                self.count(namespace, "evictions", amount)
+        connection.commit()
+
+    def delete(self, namespace, key):
+        connection = self.connection()
+        connection.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+        connection.commit()
+
+    def clear(self, namespace=None):
+        connection = self.connection()
+        if namespace is None:
+            connection.execute("DELETE FROM cache")
+        else:
+            connection.execute("DELETE FROM cache WHERE namespace = ?", (namespace,))
+        connection.commit()
+
+@st.cache_resource
+def get_cache_backend():
+    """Process-wide cache backend selected with SJA_CACHE_BACKEND (memory or sqlite)"""
+    max_entries = int(get_config("SJA_CACHE_MAX_ENTRIES", 5000))
+    ttls = {namespace: int(get_config(f"SJA_CACHE_TTL_{namespace.upper()}", ttl))
+        for namespace, ttl in CacheBackend.DEFAULT_TTLS.items()}
+    if str(get_config("SJA_CACHE_BACKEND", "memory")).lower() == "sqlite":
+        try:
+            return SQLiteCacheBackend(get_config("SJA_CACHE_PATH", "cache/sja_cache.sqlite3"), max_entries, ttls)
+        except Exception as e:
+            logger.error(f"Error opening SQLite cache, falling back to memory: {str(e)}")
+    return MemoryCacheBackend(max_entries, ttls)
+
+cache_backend = get_cache_backend()
+
+class JobIndex:
+    """On-disk inverted index of job postings in SQLite, ranked with BM25 plus a boost for known skills"""
+
+    TOKEN_PATTERN = re.compile(r"[^\W_][\w+#]*")
+    STOPWORDS = frozenset("""a an and are as at be but by can for from has have in into is it its not of on or our
+        that the their this to was we were will with you your""".split())
+    FIELD_ALIASES = {"job_id": "id", "job_title": "title", "role": "title", "company_name": "company",
+        "job_description": "description", "text": "description", "link": "url"}
+    FIELDS = ("title", "company", "location", "url", "description")
+    # Skills form their own field: prefixed terms that never collide with plain words and are boosted at query time
+    SKILL_PREFIX = "skill:"
+    # Besides the resume's skills, only its most telling plain words are scored, so search cost does not grow with
+    # resume length
+    MAX_QUERY_TERMS = 48
+
+    def __init__(self, path="cache/job_index.sqlite3", skill_boost=2.0, k1=1.2, b=0.75):
+        self.path = path
+        self.skill_boost = skill_boost
+        self.k1 = k1
+        self.b = b
+        self.version = 0
+        self.stats = {"searches": 0, "search_ms": 0.0, "ingested": 0}
+        self._collection = None
+        self._local = threading.local()
+        self._ingest_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = self.connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("""CREATE TABLE IF NOT EXISTS postings (
+            id INTEGER PRIMARY KEY, external_id TEXT NOT NULL UNIQUE, title TEXT, company TEXT, location TEXT,
+            url TEXT, description TEXT NOT NULL, content_hash TEXT NOT NULL, length INTEGER NOT NULL)""")
+        # Posting length is repeated per term so scoring reads one index range per query term, with no join
+        connection.execute("""CREATE TABLE IF NOT EXISTS terms (term TEXT NOT NULL, posting INTEGER NOT NULL,
+            tf INTEGER NOT NULL, length INTEGER NOT NULL, PRIMARY KEY (term, posting)) WITHOUT ROWID""")
+        connection.execute("CREATE INDEX IF NOT EXISTS terms_posting ON terms (posting)")
+        connection.execute("CREATE TABLE IF NOT EXISTS term_stats (term TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID")
+        connection.execute("CREATE TABLE IF NOT EXISTS sources (path TEXT PRIMARY KEY, signature TEXT NOT NULL)")
+        connection.commit()
+
+    def connection(self):
+        """One connection per thread, as sqlite3 connections must not be shared across threads"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def analyze(self, text):
+        """Term frequencies of a text: plain words plus prefixed skill terms"""
+        text = text or ""
+        terms = Counter(token for token in self.TOKEN_PATTERN.findall(text.lower())
+            if len(token) > 1 and token not in self.STOPWORDS)
+        terms.update(self.SKILL_PREFIX + skill.lower() for skill in ATSAnalyzer.SKILL_PATTERN.findall(text))
+        return terms
+
+    def collection(self):
+        """(posting count, average posting length), cached until the next ingest"""
+        if self._collection is None:
+            count, average_length = self.connection().execute("SELECT COUNT(*), AVG(length) FROM postings").fetchone()
+            self._collection = (count, average_length or 1.0)
+        return self._collection
+
+    @property
+    def size(self):
+        return self.collection()[0]
+
+    @classmethod
+    def normalize_record(cls, record):
+        """Posting fields from a JSONL/CSV record with loosely named columns, or None without a description"""
+        fields = {}
+        for key, value in record.items():
+            key = re.sub(r"\W+", "_", str(key or "").strip().lower()).strip("_")
+            fields[cls.FIELD_ALIASES.get(key, key)] = str(value).strip() if value is not None else ""
+        if not fields.get("description"):
+            return None
+        posting = {field: fields.get(field, "") for field in cls.FIELDS}
+        posting["id"] = fields.get("id") or hashlib.sha256("\n".join(
+            (posting["title"], posting["company"], posting["description"])).encode("utf-8")).hexdigest()[:16]
+        return posting
 
-Warm regards,
-[Your Full Name]
-[Your Phone Number]
-[Your Email Address]
-[LinkedIn Profile link or Portfolio]
-            """
-        },
-        "🤝 Friendly Yet Professional": {
-            "description": "A balanced approach combining warmth with professionalism, suitable for modern companies and startups",
-            "template": """
-Subject: Excited to Learn and Contribute - Internship Inquiry
+    @staticmethod
+    def iter_records(handle, filename):
+        """Records from a JSONL (or JSON array) or CSV text stream, read lazily where the format allows"""
+        if filename.lower().endswith(".csv"):
+            yield from csv.DictReader(handle)
+            return
+        first = handle.read(1)
+        while first.isspace():
+            first = handle.read(1)
+        if first == "[":
+            yield from json.loads(first + handle.read())
+            return
+        for number, line in enumerate(itertools.chain([first + handle.readline()], handle), start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping malformed job posting on line {number} of {filename}")
+
+    def ingest(self, records):
+        """Add new postings and re-index changed ones in one transaction; returns added/updated/unchanged/skipped counts"""
+        counts = {"added": 0, "updated": 0, "unchanged": 0, "skipped": 0}
+        with self._ingest_lock:
+            connection = self.connection()
+            with connection:
+                for record in records:
+                    posting = self.normalize_record(record) if isinstance(record, dict) else None
+                    if posting is None:
+                        counts["skipped"] += 1
+                        continue
+                    content_hash = hashlib.sha256(json.dumps(posting, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+                    existing = connection.execute("SELECT id, content_hash FROM postings WHERE external_id = ?",
+                        (posting["id"],)).fetchone()
+                    if existing and existing[1] == content_hash:
+                        counts["unchanged"] += 1
+                        continue
+                    terms = self.analyze("\n".join((posting["title"], posting["company"], posting["description"])))
+                    values = [posting[field] for field in self.FIELDS] + [content_hash, sum(terms.values())]
+                    if existing:
+                        posting_id = existing[0]
+                        connection.execute("""UPDATE term_stats SET df = df - 1
+                            WHERE term IN (SELECT term FROM terms WHERE posting = ?)""", (posting_id,))
+                        connection.execute("DELETE FROM terms WHERE posting = ?", (posting_id,))
+                        connection.execute("""UPDATE postings SET title = ?, company = ?, location = ?, url = ?,
+                            description = ?, content_hash = ?, length = ? WHERE id = ?""", values + [posting_id])
+                        counts["updated"] += 1
+                    else:
+                        posting_id = connection.execute("""INSERT INTO postings (title, company, location, url,
+                            description, content_hash, length, external_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                            values + [posting["id"]]).lastrowid
+                        counts["added"] += 1
+                    connection.executemany("INSERT INTO terms (term, posting, tf, length) VALUES (?, ?, ?, ?)",
+                        [(term, posting_id, tf, values[-1]) for term, tf in terms.items()])
+                    connection.executemany("""INSERT INTO term_stats (term, df) VALUES (?, 1)
+                        ON CONFLICT (term) DO UPDATE SET df = df + 1""", [(term,) for term in terms])
+            if counts["added"] or counts["updated"]:
+                self._collection = None
+                self.version += 1
+                self.stats["ingested"] += counts["added"] + counts["updated"]
+        logger.info(f"Job postings ingested: {counts}")
+        return counts
+
+    def ingest_upload(self, data, filename):
+        """Ingest an uploaded JSONL/CSV file of postings"""
+        return self.ingest(self.iter_records(io.StringIO(data.decode("utf-8-sig")), filename))
 
-Hi [Recipient's Name],
+    @staticmethod
+    def file_signature(path):
+        stat = os.stat(path)
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
 
-I hope you're having a great day! I'm [Your Name], currently pursuing [Your Degree] at [Your College/University Name], and I'm reaching out to explore internship opportunities with [Company Name].
+    def needs_sync(self, path):
+        """Whether a corpus file changed since it was last ingested (a stat call and one indexed lookup)"""
+        try:
+            signature = self.file_signature(path)
+        except OSError:
+            return False
+        row = self.connection().execute("SELECT signature FROM sources WHERE path = ?", (path,)).fetchone()
+        return not row or row[0] != signature
+
+    def sync_file(self, path):
+        """Incrementally ingest a corpus file if it changed; unchanged postings are skipped by content hash"""
+        # Sessions that notice the change at the same time wait for the first sync instead of repeating it
+        with self._sync_lock:
+            if not self.needs_sync(path):
+                return {"added": 0, "updated": 0, "unchanged": 0, "skipped": 0}
+            signature = self.file_signature(path)
+            with open(path, encoding="utf-8-sig", newline="") as handle:
+                counts = self.ingest(self.iter_records(handle, path))
+            connection = self.connection()
+            connection.execute("INSERT OR REPLACE INTO sources (path, signature) VALUES (?, ?)", (path, signature))
+            connection.commit()
+            return counts
+
+    def search(self, text, k=10):
+        """Top-k postings for a resume (or any text) by BM25, skill terms weighted by skill_boost"""
+        start = time.perf_counter()
+        count, average_length = self.collection()
+        query = self.analyze(text)
+        if not count or not query:
+            return []
+        connection = self.connection()
+        frequencies = {}
+        terms = list(query)
+        for offset in range(0, len(terms), 500):
+            batch = terms[offset:offset + 500]
+            frequencies.update(connection.execute(f"""SELECT term, df FROM term_stats
+                WHERE df > 0 AND term IN ({", ".join(["?"] * len(batch))})""", batch))
+        # Plain words in over half of the postings barely change the ranking but have the longest posting lists,
+        # and a word that is also a skill is scored once, through its boosted skill term
+        idf = {term: math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in frequencies.items() if term.startswith(self.SKILL_PREFIX)
+            or (frequency <= count / 2 and self.SKILL_PREFIX + term not in frequencies)}
+        # Skills are always scored; the cap applies to plain words, ranked by tf-idf so rare one-off words (names,
+        # places) do not crowd out what the resume is about
+        skills = {term: weight * self.skill_boost for term, weight in idf.items() if term.startswith(self.SKILL_PREFIX)}
+        words = sorted((term for term in idf if term not in skills), key=lambda term: query[term] * idf[term],
+            reverse=True)[:self.MAX_QUERY_TERMS]
+        weights = {**skills, **{term: idf[term] for term in words}}
+        if not weights:
+            return []
+
+        # Numeric BM25 constants are inlined; SQLite cannot mix them as named parameters with the positional ones
+        k1, b = float(self.k1), float(self.b)
+        top = connection.execute(f"""WITH query (term, weight) AS (VALUES {", ".join(["(?, ?)"] * len(weights))})
+            SELECT terms.posting, SUM(query.weight * terms.tf * {k1 + 1}
+                / (terms.tf + {k1} * (1 - {b} + {b} * terms.length / {float(average_length)}))) AS score
+            FROM query JOIN terms ON terms.term = query.term
+            GROUP BY terms.posting ORDER BY score DESC, terms.posting LIMIT ?""",
+            [value for item in weights.items() for value in item] + [int(k)]).fetchall()
+        scores = dict(top)
+        postings = {row[0]: row[1:] for row in connection.execute(f"""SELECT id, external_id, title, company, location,
+            url, description FROM postings WHERE id IN ({", ".join(["?"] * len(scores))})""", list(scores))}
+
+        resume_skills = {term[len(self.SKILL_PREFIX):] for term in query if term.startswith(self.SKILL_PREFIX)}
+        results = []
+        for posting_id, score in top:
+            external_id, title, company, location, url, description = postings[posting_id]
+            posting_skills = {skill.lower(): skill for skill in ATSAnalyzer.SKILL_PATTERN.findall(description)}
+            results.append({"id": external_id, "title": title, "company": company, "location": location, "url": url,
+                "description": description, "score": score,
+                "matched_skills": [skill for key, skill in posting_skills.items() if key in resume_skills]})
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.stats["searches"] += 1
+        self.stats["search_ms"] += elapsed_ms
+        return results
+
+@st.cache_resource
+def get_job_index():
+    """Process-wide job posting index at SJA_JOBS_INDEX_PATH, or None if it cannot be opened"""
+    try:
+        return JobIndex(get_config("SJA_JOBS_INDEX_PATH", "cache/job_index.sqlite3"),
+            skill_boost=float(get_config("SJA_JOBS_SKILL_BOOST", 2.0)))
+    except Exception as e:
+        logger.error(f"Error opening job posting index: {str(e)}")
+        return None
+
+job_index = get_job_index()
+
+class SingleFlight:
+    """Let identical concurrent requests attach to one in-flight call and share its result"""
+
+    def __init__(self):
+        self.calls = {}
+        self.stats = {"calls": 0, "coalesced": 0}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Run fn for the first caller of key; callers arriving while it runs wait for the same result"""
+        with self._lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = {"done": threading.Event(), "result": None, "error": None}
+                self.calls[key] = call
+                self.stats["calls"] += 1
+            else:
+                self.stats["coalesced"] += 1
 
-I've always admired your company's commitment to [specific value or field]. As someone passionate about [specific area], I believe this could be an incredible place for me to learn and grow.
+        if not leader:
+            call["done"].wait()
+            if isinstance(call["error"], JobCancelledError):
+                # The leader's job was cancelled, not this caller's; make the call on this caller's behalf
+                return self.do(key, fn)
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
 
-I've gained practical knowledge in [specific skills or projects] and I'm eager to contribute to your team while gaining real-world experience in the industry/role.
+        try:
+            call["result"] = fn()
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                self.calls.pop(key, None)
+            call["done"].set()
+
+    @property
+    def coalescing_rate(self):
+        total = self.stats["calls"] + self.stats["coalesced"]
+        return self.stats["coalesced"] / total if total else 0.0
+
+@st.cache_resource
+def get_single_flight():
+    """Process-wide single-flight group for provider requests"""
+    return SingleFlight()
+
+single_flight = get_single_flight()
+
+@st.cache_resource
+def get_accounting_context():
+    """Process-wide context variable, so objects cached by earlier script runs see the same one"""
+    return contextvars.ContextVar("accounting_context", default={})
+
+# Dimensions (kind, language, module, ...) describing the provider call running in the current context
+accounting_context = get_accounting_context()
+
+@contextmanager
+def accounting_scope(**dimensions):
+    """Attribute provider calls made inside the block to the given dimensions"""
+    token = accounting_context.set({**accounting_context.get(), **dimensions})
+    try:
+        yield
+    finally:
+        accounting_context.reset(token)
+
+class TokenLedger:
+    """Aggregate provider token usage per dimension value, using a local estimate when usage is missing"""
+
+    def __init__(self, session_budget=0, module_budget=0, light_ratio=0.8, max_sessions=5000):
+        # Budgets are input + output tokens per session and per (session, module); 0 means unlimited
+        self.session_budget = session_budget
+        self.module_budget = module_budget
+        self.light_ratio = light_ratio
+        self.max_sessions = max_sessions
+        self.totals = {}
+        # Sessions by last use, each with its session_module keys, so idle sessions can be dropped
+        self.sessions = OrderedDict()
+        self.savings = {}
+        self._lock = threading.Lock()
 
-Would it be possible to discuss how I can support your team? I've attached my resume for your reference and would be delighted to provide any further details. Looking forward to hearing from you!
+    @staticmethod
+    def estimate_tokens(text):
+        """Rough token count: about 4 ASCII characters per token, Indic scripts closer to 1.5 characters"""
+        text = text or ""
+        ascii_chars = sum(1 for char in text if ord(char) < 128)
+        return int(ascii_chars / 4 + (len(text) - ascii_chars) / 1.5) + 1
 
-Best regards,
-[Your Full Name]
-[Your Phone Number]
-[Your Email Address]
-[LinkedIn Profile Link or Portfolio]
-            """
-        },
-        "🌟 Enthusiastic and Curious": {
-            "description": "An energetic approach emphasizing eagerness to learn and contribute, great for innovation-focused companies",
-            "template": """
-Subject: Internship Inquiry: Eager to Learn and Make an Impact
+    @staticmethod
+    def payload_text(payload):
+        """All text in a provider payload, for estimating its input tokens"""
+        if isinstance(payload, str):
+            return payload
+        if isinstance(payload, dict):
+            return "\n".join(TokenLedger.payload_text(value) for value in payload.values())
+        if isinstance(payload, (list, tuple)):
+            return "\n".join(TokenLedger.payload_text(value) for value in payload)
+        return ""
+
+    def record(self, dimensions, input_tokens, output_tokens, estimated=False):
+        if "session" in dimensions and "module" in dimensions:
+            dimensions = {**dimensions, "session_module": f"{dimensions['session']}/{dimensions['module']}"}
+        with self._lock:
+            for dimension, value in dimensions.items():
+                entry = self.totals.setdefault(dimension, {}).setdefault(value,
+                    {"input": 0, "output": 0, "calls": 0, "estimated_calls": 0})
+                entry["input"] += input_tokens
+                entry["output"] += output_tokens
+                entry["calls"] += 1
+                entry["estimated_calls"] += int(estimated)
+            if "session" in dimensions:
+                self.touch_session(dimensions["session"], dimensions.get("session_module"))
+
+    def touch_session(self, session, session_module=None):
+        """Mark a session as recently used, dropping the least recently used sessions' totals beyond max_sessions;
+        called with the lock held"""
+        modules = self.sessions.pop(session, set())
+        if session_module:
+            modules.add(session_module)
+        self.sessions[session] = modules
+        while len(self.sessions) > self.max_sessions:
+            idle_session, idle_modules = self.sessions.popitem(last=False)
+            self.totals.get("session", {}).pop(idle_session, None)
+            for key in idle_modules:
+                self.totals.get("session_module", {}).pop(key, None)
+
+    def record_savings(self, language, tokens):
+        """Tokens not sent because a result was derived instead of recomputed"""
+        with self._lock:
+            self.savings[language] = self.savings.get(language, 0) + max(0, tokens)
+
+    def by(self, dimension):
+        return self.totals.get(dimension, {})
+
+    def used(self, dimension, value):
+        entry = self.totals.get(dimension, {}).get(value)
+        return entry["input"] + entry["output"] if entry else 0
+
+    def budget_usage(self, dimensions):
+        """Highest share of the session or module budget used by the session in dimensions (0 without budgets)"""
+        session = dimensions.get("session")
+        if session is None:
+            return 0.0
+        shares = [0.0]
+        if self.session_budget:
+            shares.append(self.used("session", session) / self.session_budget)
+        if self.module_budget and dimensions.get("module"):
+            shares.append(self.used("session_module", f"{session}/{dimensions['module']}") / self.module_budget)
+        return max(shares)
+
+    def budget_state(self, dimensions):
+        """'ok', 'light' once a budget is past light_ratio (use lighter models), or 'exhausted' (stay local)"""
+        usage = self.budget_usage(dimensions)
+        if usage >= 1.0:
+            return "exhausted"
+        return "light" if usage >= self.light_ratio else "ok"
+
+@st.cache_resource
+def get_token_ledger():
+    """Process-wide token ledger with budgets from SJA_*_TOKEN_BUDGET settings"""
+    return TokenLedger(session_budget=int(get_config("SJA_SESSION_TOKEN_BUDGET", 0)),
+        module_budget=int(get_config("SJA_MODULE_TOKEN_BUDGET", 0)),
+        light_ratio=float(get_config("SJA_BUDGET_LIGHT_RATIO", 0.8)),
+        max_sessions=int(get_config("SJA_LEDGER_MAX_SESSIONS", 5000)))
+
+token_ledger = get_token_ledger()
+
+class ModelRouter:
+    """Pick a model and output budget per (provider, module, language, input size) and track how each route performs"""
+
+    # Pseudo-module routed to once a session nears its token budget
+    LIGHT_MODULE = "Light"
+
+    # Evaluated in order; the first route whose conditions all match wins, so catch-alls go last
+    DEFAULT_ROUTES = [
+        {"provider": "gemini", "module": LIGHT_MODULE, "model": "gemini-1.5-flash", "max_tokens": 1024},
+        {"provider": "groq", "module": LIGHT_MODULE, "model": "llama-3.1-8b-instant", "max_tokens": 1024},
+        {"provider": "gemini", "module": "Quick Summary", "model": "gemini-1.5-flash", "max_tokens": 1024},
+        {"provider": "groq", "module": "Quick Summary", "model": "llama-3.1-8b-instant", "max_tokens": 1024},
+        {"provider": "groq", "module": "Skills Gap Analysis", "model": "llama-3.1-8b-instant", "max_tokens": 2048},
+        # mistral-saba-24b has a 32k context window; long resume + JD pairs go to a long-context model
+        {"provider": "groq", "min_input_chars": 60000, "model": "llama-3.3-70b-versatile", "max_tokens": 4000},
+        {"provider": "gemini", "model": "gemini-1.5-pro", "max_tokens": None},
+        {"provider": "groq", "model": "mistral-saba-24b", "max_tokens": 4000},
+    ]
+
+    def __init__(self, routes=None):
+        self.routes = list(routes or []) + self.DEFAULT_ROUTES
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def route(self, provider, module=None, language=None, input_chars=0):
+        """First matching route as a dict with name, model and max_tokens"""
+        for route in self.routes:
+            if route.get("provider", provider) != provider or route.get("module", module) != module:
+                continue
+            if route.get("language", language) != language:
+                continue
+            if not route.get("min_input_chars", 0) <= input_chars <= route.get("max_input_chars", float("inf")):
+                continue
+            name = route.get("name") or f"{provider}:{route.get('module', '*')}:{route['model']}"
+            return {"name": name, "model": route["model"], "max_tokens": route.get("max_tokens")}
+        raise ValueError(f"No model route for provider {provider}")
+
+    def record(self, name, latency=None, quality=None):
+        """Add an observed provider latency (seconds) or result quality (0-1) to a route's totals"""
+        with self._lock:
+            entry = self.stats.setdefault(name, {"calls": 0, "latency": 0.0, "rated": 0, "quality": 0.0})
+            if latency is not None:
+                entry["calls"] += 1
+                entry["latency"] += latency
+            if quality is not None:
+                entry["rated"] += 1
+                entry["quality"] += quality
+
+@st.cache_resource
+def get_model_router():
+    """Process-wide model router, with routes from SJA_ROUTES_PATH taking precedence over the defaults"""
+    routes_path = get_config("SJA_ROUTES_PATH")
+    routes = []
+    if routes_path:
+        try:
+            with open(routes_path, encoding="utf-8") as handle:
+                routes = json.load(handle)
+        except Exception as e:
+            logger.error(f"Error loading model routes from {routes_path}: {str(e)}")
+    return ModelRouter(routes)
 
-Dear [Recipient's Name],
+model_router = get_model_router()
 
-I hope this email finds you well. My name is [Your Name], and I am a [Year of Study] student specializing in [Your Field of Study] at [Your College/University Name].
+class RerunStats:
+    """Count script runs and their durations per kind (full app reruns, fragment panels)"""
 
-I am writing to express my interest in an internship opportunity at [Company Name]. Your organization's work in [specific domain] has always inspired me, particularly [mention a specific project, value, or achievement of the company].
+    def __init__(self):
+        self.stats = {}
+        self._lock = threading.Lock()
 
-With foundational experience in [your skills/experience], I'm keen to contribute to your team while learning from the expertise of your professionals. I'm confident that this internship will give me an opportunity to develop my skills and create value for your organization.
+    @contextmanager
+    def track(self, kind):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                entry = self.stats.setdefault(kind, {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+                entry["count"] += 1
+                entry["seconds"] += elapsed
+                entry["max_seconds"] = max(entry["max_seconds"], elapsed)
+
+@st.cache_resource
+def get_rerun_stats():
+    """Process-wide rerun statistics"""
+    return RerunStats()
+
+rerun_stats = get_rerun_stats()
+
+class PromptRegistry:
+    """Prompt templates loaded once from JSON data files (one group per file), each with a version and content hash"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.groups = {}
+        self.hashes = {}
+        # Messages rendered from the templates, kept with the registry so they outlive script reruns
+        self.renders = OrderedDict()
+        self._renders_lock = threading.Lock()
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith(".json"):
+                continue
+            group = os.path.splitext(filename)[0]
+            with open(os.path.join(directory, filename), encoding="utf-8") as handle:
+                self.groups[group] = json.load(handle)
+            for name, entry in self.groups[group].items():
+                self.hashes[(group, name)] = hashlib.sha256(
+                    json.dumps(entry, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:12]
+
+    def group(self, group):
+        return self.groups[group]
+
+    def field(self, group, field):
+        """One field of every entry in a group, keyed by entry name"""
+        return {name: entry[field] for name, entry in self.groups[group].items()}
+
+    def version(self, group, name):
+        return self.groups[group].get(name, {}).get("version", 0)
+
+    def hash(self, group, name):
+        return self.hashes.get((group, name), "")
+
+    def rendered(self, key, render, max_entries=256):
+        """render() for key, run on first use only; the least recently used renders beyond max_entries are dropped"""
+        with self._renders_lock:
+            if key in self.renders:
+                self.renders.move_to_end(key)
+                return self.renders[key]
+        value = render()
+        with self._renders_lock:
+            self.renders[key] = value
+            while len(self.renders) > max_entries:
+                self.renders.popitem(last=False)
+        return value
+
+    @property
+    def digest(self):
+        """Hash over every template, identifying the deployed prompt set"""
+        return hashlib.sha256("".join(f"{group}/{name}={value}"
+            for (group, name), value in sorted(self.hashes.items())).encode("utf-8")).hexdigest()[:12]
+
+@st.cache_resource
+def get_prompt_registry():
+    """Process-wide prompt registry loaded from SJA_PROMPTS_DIR"""
+    return PromptRegistry(get_config("SJA_PROMPTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts")))
+
+prompt_registry = get_prompt_registry()
+
+class ATSAnalyzer:
+    # Language prompts dictionary
+    # Prompt texts live in the prompt registry (prompts/*.json); these are views of the loaded entries
+    LANGUAGE_PROMPTS = prompt_registry.group("languages")
+    ANALYSIS_TYPES = prompt_registry.field("analysis_types", "prompt")
+
+    # AI models
+    AI_MODELS = {"Google Gemini": "🤖 Google Gemini (High accurate and reliable)","Groq": "🤖 Groq (Fast but moderately accurate)"}
 
-I would be thrilled to connect and discuss how I can contribute to your team. I've attached my resume for your consideration. Thank you for your time, and I look forward to hearing from you.
+    # Precompiled patterns for parsing structured results in every supported language
+    INDIC_DIGITS = str.maketrans("०१२३४५६७८९౦౧౨౩౪౫౬౭౮౯", "01234567890123456789")
+    JSON_BLOCK_PATTERN = re.compile(r"```(?:json)?\s*(\{[\s\S]*?\})\s*```", re.IGNORECASE)
+    TRAILING_COMMA_PATTERN = re.compile(r",\s*([}\]])")
+    # An explicit "Match Score:" label (optionally bold or with a unit such as "(%)") and the number right after it;
+    # the number counts as a score only with a % or /100 suffix, or a percent unit in the label
+    SCORE_PATTERN = re.compile(
+        r"(?:\bmatch\s+score\b|मैच\s*स्कोर|మ్యాచ్\s*స్కోర్)[\s*_]{0,3}(?:\((?P<unit>[^)\n]{0,12})\))?[\s*_]{0,3}[:：]"
+        r"[\s*_]{0,3}(?P<score>[\d०-९౦-౯]{1,3}(?:\.[\d०-९౦-౯]+)?)\s*(?P<suffix>%|/\s*100\b)?",
+        re.IGNORECASE)
 
-Best regards,
-[Your Full Name]
-[Your Phone Number]
-[Your Email Address]
-[LinkedIn Profile Link or Portfolio]
-            """}}
+    # Cold mail 
+    COLD_MAIL_TYPES = prompt_registry.group("cold_mail_types")
+
+    # Template placeholders filled from personal information, keyed by lowercased placeholder text
+    PLACEHOLDER_FIELDS = {
+        "your name": "name", "your full name": "name",
+        "your email address": "email", "your email": "email",
+        "your phone number": "phone", "your phone": "phone",
+        "your college/university name": "university", "your university": "university",
+        "linkedin profile or portfolio link": "linkedin", "linkedin profile link or portfolio": "linkedin",
+        "your linkedin": "linkedin",
+        "your degree": "degree",
+        "recipient's name": "recipient_name",
+        "company name": "company",
+        "role": "role",
+        "your year": "year", "year of study": "year",
+        "your field of study": "field_of_study",
+        "specific skills/tools": "skills", "specific skills or projects": "skills", "your skills/experience": "skills",
+        "specific field/area": "field", "specific area": "field", "specific domain": "field",
+        "specific value or field": "field"}
+    PLACEHOLDER_PATTERN = re.compile(r"\[([^\[\]\n]{1,80})\]")
+
+    # Vocabulary and patterns for extracting facts locally from resume and JD text
+    SKILL_KEYWORDS = (
+        "Python", "Java", "JavaScript", "TypeScript", "C++", "C#", "C", "Go", "Rust", "Kotlin", "Swift", "PHP", "Ruby",
+        "R", "MATLAB", "Scala", "SQL", "NoSQL", "MySQL", "PostgreSQL", "MongoDB", "Redis", "HTML", "CSS", "React",
+        "Angular", "Vue", "Node.js", "Express", "Django", "Flask", "FastAPI", "Spring", "Spring Boot", ".NET",
+        "Android", "iOS", "Flutter", "AWS", "Azure", "GCP", "Docker", "Kubernetes", "Terraform", "Jenkins", "Git",
+        "Linux", "REST", "GraphQL", "Microservices", "CI/CD", "Machine Learning", "Deep Learning", "NLP",
+        "Computer Vision", "Data Analysis", "Data Science", "Pandas", "NumPy", "scikit-learn", "TensorFlow",
+        "PyTorch", "Keras", "Spark", "Hadoop", "Tableau", "Power BI", "Excel", "Figma", "Agile", "Scrum",
+        "Cloud Computing", "Cybersecurity", "Blockchain", "DevOps", "Selenium", "Embedded Systems", "IoT")
+    SKILL_PATTERN = re.compile(r"(?<![\w+#.])(" + "|".join(sorted(map(re.escape, SKILL_KEYWORDS), key=len, reverse=True))
+        + r")(?![\w+#])", re.IGNORECASE)
+    DEGREE_PATTERN = re.compile(
+        r"\b(B\.?\s?Tech|B\.?\s?E\b|B\.?\s?Sc|B\.?\s?Com|BCA|MCA|M\.?\s?Tech|M\.?\s?Sc|MBA|Ph\.?\s?D"
+        r"|Bachelor(?:'s)?\s+of\s+[A-Z][A-Za-z]+(?:\s+[A-Z][A-Za-z]+)*|Master(?:'s)?\s+of\s+[A-Z][A-Za-z]+(?:\s+[A-Z][A-Za-z]+)*)\.?"
+        r"(?:\s*(?:in|of)\s+([A-Z][A-Za-z&]+(?:\s+[A-Z&][A-Za-z&]*)*))?")
+    UNIVERSITY_PATTERN = re.compile(r"[^,|\n]*\b(?:University|Institute|College|IIT|NIT|IIIT)\b[^,|\n]*")
+    YEAR_PATTERN = re.compile(r"\b([1-5])(?:st|nd|rd|th)\s+year\b", re.IGNORECASE)
+    COMPANY_PATTERN = re.compile(
+        r"(?:\bAbout|\bat|\bjoin|\bJoin|Company(?:\s+Name)?\s*:)\s+((?:[A-Z][\w&.-]*)(?:\s+[A-Z][\w&.-]*){0,3})"
+        r"|\b([A-Z][\w&.-]*(?:\s+[A-Z][\w&.-]*){0,3})\s+is\s+(?:hiring|looking)")
+
+    EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+    PHONE_PATTERN = re.compile(r"\+?\d[\d\s().-]{8,18}\d")
+    LINKEDIN_PATTERN = re.compile(r"(?:https?://)?(?:[a-z]{2,3}\.)?linkedin\.com/in/[\w%-]+/?", re.IGNORECASE)
+    PORTFOLIO_PATTERN = re.compile(r"(?:https?://)?(?:www\.)?(?:github\.com|gitlab\.com)/[\w-]+/?", re.IGNORECASE)
+    NAME_PATTERN = re.compile(r"^[A-Za-z][A-Za-z.'-]*(?:\s+[A-Za-z][A-Za-z.'-]*){1,3}$")
+    # Resume section headings mapped to their canonical section
+    SECTION_ALIASES = {
+        "summary": "summary", "objective": "summary", "career objective": "summary", "profile": "summary",
+        "professional summary": "summary", "about me": "summary",
+        "experience": "experience", "work experience": "experience", "professional experience": "experience",
+        "employment": "experience", "employment history": "experience", "internships": "experience",
+        "internship": "experience", "work history": "experience",
+        "projects": "projects", "academic projects": "projects", "personal projects": "projects", "key projects": "projects",
+        "skills": "skills", "technical skills": "skills", "core competencies": "skills", "key skills": "skills",
+        "education": "education", "academics": "education", "academic background": "education",
+        "educational qualifications": "education", "qualifications": "education",
+        "certifications": "certifications", "certificates": "certifications", "courses": "certifications",
+        "achievements": "achievements", "awards": "achievements", "honors": "achievements",
+        "publications": "publications", "research": "publications"}
+    SECTION_PATTERN = re.compile(r"^(?:#+\s*)?(" + "|".join(sorted(map(re.escape, SECTION_ALIASES), key=len, reverse=True))
+        + r")\s*:?$", re.IGNORECASE)
+
+    # Prompts for translation, chunked analysis and draft refinement
+    TRANSLATION_PROMPT = prompt_registry.group("tasks")["translation"]["prompt"]
+    CHUNK_ANALYSIS_PROMPT = prompt_registry.group("tasks")["chunk_analysis"]["prompt"]
+    CHUNK_REDUCE_PROMPT = prompt_registry.group("tasks")["chunk_reduce"]["prompt"]
+    REFINE_DRAFT_PROMPT = prompt_registry.group("tasks")["refine_draft"]["prompt"]
+
+    # Report export formats: (file extension, MIME type)
+    EXPORT_FORMATS = {
+        "Markdown": ("md", "text/markdown"),
+        "JSON": ("json", "application/json"),
+        "DOCX": ("docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+        "PDF": ("pdf", "application/pdf")}
+
+    # Accepted CSV headers for bulk cold mails
+    BULK_CSV_COLUMNS = {
+        "company": ("company", "company_name"),
+        "recipient_name": ("recipient_name", "recipient", "name"),
+        "role": ("role", "job_title", "position"),
+        "job_description": ("job_description", "jd", "jd_text", "description")}
 
     @staticmethod
     def get_prompts(language="English"):
         """Get language-specific prompts"""
-        prompts = {
-            "English": {
-                "system_msg": """You are a professional resume analyzer. Your task is to analyze resumes in English.
-                Always structure your response as follows:
-                1. Match Score (%)
-                2. Key Strengths
-                3. Missing Skills
-                4. Improvement Suggestions""",
-                "user_msg": """Please analyze this resume against the job description in English.
-                Ensure you follow the exact format mentioned above.""",
-                "result_prefix": "Analysis Results:\n\n"},
-            "हिंदी": {
-                "system_msg": """आप एक पेशेवर रिज्यूमे विश्लेषक हैं। आपका काम रिज्यूमे का विश्लेषण हिंदी में करना है।
-                कृपया अपना जवाब इस प्रारूप में दें:
-                1. मैच स्कोर (%)
-                2. मुख्य ताकत
-                3. कमी वाले कौशल
-                4. सुधार के सुझाव""",
-                "user_msg": """कृपया इस रिज्यूमे का विश्लेषण नौकरी के विवरण के अनुसार हिंदी में करें।
-                कृपया ऊपर दिए गए प्रारूप का पालन करें।""",
-                "result_prefix": "विश्लेषण परिणाम:\n\n"},
-            "తెలుగు": {
-                "system_msg": """మీరు ఒక వృత్తిపరమైన రెస్యూమ్ విశ్లేషకులు. మీ పని రెస్యూమ్‌ని తెలుగులో విశ్లేషించడం.
-                దయచేసి మీ సమాధానాన్ని ఈ ఫార్మాట్‌లో ఇవ్వండి:
-                1. మ్యాచ్ స్కోర్ (%)
-                2. ముఖ్య బలాలు
-                3. కొరవడిన నైపుణ్యాలు
-                4. మెరుగుదల సూచనలు""",
-                "user_msg": """దయచేసి ఈ రెస్యూమ్‌ని ఉద్యోగ వివరణతో పోల్చి తెలుగులో విశ్లేషించండి.
-                పైన పేర్కొన్న ఫార్మాట్‌ని ఖచ్చితంగా పాటించండి.""",
-                "result_prefix": "విశ్లేషణ ఫలితాలు:\n\n"}}
-        return prompts.get(language, prompts["English"])
+        return ATSAnalyzer.LANGUAGE_PROMPTS.get(language, ATSAnalyzer.LANGUAGE_PROMPTS["English"])
 
     @staticmethod
     def get_error_message(language):
         """Get language-specific error messages"""
-        error_messages = {
-            "English": "Error in analysis. Please try again or contact support.",
-            "हिंदी": "विश्लेषण में त्रुटि हुई। कृपया पुनः प्रयास करें या सहायता से संपर्क करें।",
-            "తెలుగు": "విశ్లేషణలో లోపం. దయచేసి మళ్లీ ప్రయత్నించండి లేదా సహాయం కోసం సంప్రదించండి."}
-        return error_messages.get(language, error_messages["English"])
+        return ATSAnalyzer.get_prompts(language)["error_message"]
 
     @staticmethod
-    def format_groq_messages(selected_lang, input_prompt, job_description, pdf_text, language):
-        """Format messages for Groq API"""
-        return [{"role": "system","content": selected_lang["system_msg"]},{"role": "user","content": f"""{selected_lang["user_msg"]}
+    def prompt_version(analysis_type, language):
+        """Version label of the module and language prompts behind an analysis, e.g. Quick Summary v1/English v1"""
+        return (f"{analysis_type} v{prompt_registry.version('analysis_types', analysis_type)}/"
+            f"{language} v{prompt_registry.version('languages', language)}")
 
-Analysis Requirements:
-{input_prompt}
+    @staticmethod
+    def prompt_hash(analysis_type, language):
+        """Content hash of the module and language prompts, so template edits invalidate exactly their cached results"""
+        return prompt_registry.hash("analysis_types", analysis_type) + prompt_registry.hash("languages", language)
+
+    @staticmethod
+    def build_shared_prefix(pdf_text, job_description, system_msg=None):
+        """Stable prompt prefix shared by every module run against the same documents"""
+        prefix = f"""Resume Content:
+{pdf_text}
 
 Job Description:
 {job_description}
+"""
+        return f"{system_msg}\n\n{prefix}" if system_msg else prefix
 
-Resume Content:
-{pdf_text}
+    @staticmethod
+    def format_groq_messages(selected_lang, input_prompt, job_description, pdf_text, language):
+        """Format messages for Groq API with the shared documents first so the prefix can be cached"""
+        return [{"role": "system","content": selected_lang["system_msg"]},
+            {"role": "user","content": ATSAnalyzer.build_shared_prefix(pdf_text, job_description)},
+            {"role": "user","content": ATSAnalyzer.render_groq_task(selected_lang["user_msg"], input_prompt, language)}]
+
+    @staticmethod
+    def render_groq_task(user_msg, input_prompt, language):
+        """Task message for a (language, module) pair, rendered once per process"""
+        return prompt_registry.rendered(("groq_task", user_msg, input_prompt, language), lambda: f"""{user_msg}
+
+Analysis Requirements:
+{input_prompt}
 
 Remember to:
 1. Keep the analysis in {language}
 2. Follow the exact format specified
 3. Provide clear, actionable feedback
-4. Include a numerical match score"""}]
+4. Include a numerical match score""")
+
+    @staticmethod
+    def render_gemini_task(input_prompt, language):
+        """Task suffix sent after the shared Gemini prefix, rendered once per (module, language) and process"""
+        return prompt_registry.rendered(("gemini_task", input_prompt, language), lambda: f"""
+            Task: {input_prompt}
+
+            Language: {language}
+
+            Please provide a detailed analysis based on the above information.
+            """)
 
     @staticmethod
-    def get_ai_response(model_choice, input_prompt, pdf_text, job_description, language="English"):
-        """Get AI response from selected model"""
+    def get_gemini_model(model_name="gemini-1.5-pro"):
+        """Initialize a Gemini model, falling back through known model names"""
+        for candidate in (model_name, f"models/{model_name}", "models/gemini-pro"):
+            try:
+                logger.debug(f"Attempting to initialize Gemini model with {candidate}")
+                model = genai.GenerativeModel(candidate)
+                logger.debug(f"Successfully initialized {candidate} model")
+                return model
+            except Exception as e:
+                logger.debug(f"Failed with {candidate}: {str(e)}")
+        # Fall back to original format as last resort
+        logger.debug("Falling back to gemini-pro")
+        return genai.GenerativeModel("gemini-pro")
+
+    @staticmethod
+    def cached_provider_call(provider, model, payload, live_call):
+        """Serve identical provider requests from the shared cache, otherwise call through the cassette"""
+        cache_key = ProviderCassette.request_key(provider, model, payload)
+        cached = cache_backend.get("llm", cache_key)
+        if cached:
+            return ProviderReply(cached["text"], cached.get("usage"), 0.0)
+        reply = provider_cassette.call(provider, model, payload, live_call)
+        if reply.text:
+            cache_backend.set("llm", cache_key, {"text": reply.text, "usage": reply.usage})
+        if "route" in accounting_context.get():
+            model_router.record(accounting_context.get()["route"], latency=reply.latency)
+
+        usage = reply.usage or {}
+        input_tokens = usage.get("input_tokens") or TokenLedger.estimate_tokens(TokenLedger.payload_text(payload))
+        output_tokens = usage.get("output_tokens") or TokenLedger.estimate_tokens(reply.text)
+        token_ledger.record({"provider": provider, **accounting_context.get()}, input_tokens, output_tokens,
+            estimated=not usage)
+        return reply
+
+    @staticmethod
+    def get_cached_gemini_model(shared_prefix, model_name):
+        """Model bound to an explicit Gemini context cache for the prefix, or None where unavailable"""
+        caching = getattr(genai, "caching", None)
+        entry = prompt_prefix_cache.lookup(shared_prefix)
+        if caching is None or entry["uncacheable"]:
+            return None
+        if entry["handle"] is None:
+            try:
+                entry["handle"] = caching.CachedContent.create(model=f"models/{model_name}",
+                    contents=[shared_prefix], ttl=timedelta(seconds=prompt_prefix_cache.ttl_seconds))
+                prompt_prefix_cache.stats["provider_cached"] += 1
+            except Exception as e:
+                # Prefixes below the provider's minimum cacheable size are sent inline instead
+                logger.debug(f"Gemini context cache unavailable for prefix: {str(e)}")
+                entry["uncacheable"] = True
+                return None
+        return genai.GenerativeModel.from_cached_content(entry["handle"])
+
+    @staticmethod
+    def call_gemini(contents, model_name="gemini-1.5-pro", shared_prefix=None, max_output_tokens=None):
+        """Send contents to Gemini through the provider cassette, after an optional cached shared prefix"""
+        generation_config = {"max_output_tokens": max_output_tokens} if max_output_tokens else None
+        def live_call():
+            model = ATSAnalyzer.get_cached_gemini_model(shared_prefix, model_name) if shared_prefix else None
+            if model is not None:
+                response = provider_loop.run(model.generate_content_async(contents,
+                    generation_config=generation_config))
+            else:
+                model = ATSAnalyzer.get_gemini_model(model_name)
+                response = provider_loop.run(model.generate_content_async(
+                    [shared_prefix, contents] if shared_prefix else contents, generation_config=generation_config))
+            usage = getattr(response, "usage_metadata", None)
+            if usage is not None:
+                usage = {"input_tokens": usage.prompt_token_count, "output_tokens": usage.candidates_token_count}
+            return response.text, usage
+        payload = {"contents": contents}
+        if shared_prefix:
+            payload["shared_prefix"] = shared_prefix
+        if generation_config:
+            payload["generation_config"] = generation_config
+        return ATSAnalyzer.cached_provider_call("gemini", model_name, payload, live_call)
+
+    @staticmethod
+    def call_groq(messages, model="mistral-saba-24b", **params):
+        """Send chat messages to Groq through the provider cassette"""
+        # Groq caches identical message prefixes on its side; the local cache records the reuse
+        prompt_prefix_cache.lookup("\n".join(message["content"] for message in messages[:-1]))
+        def live_call():
+            chat_completion = provider_loop.run(
+                provider_loop.groq_client.chat.completions.create(messages=messages, model=model, **params))
+            usage = getattr(chat_completion, "usage", None)
+            if usage is not None:
+                usage = {"input_tokens": usage.prompt_tokens, "output_tokens": usage.completion_tokens}
+            return chat_completion.choices[0].message.content, usage
+        return ATSAnalyzer.cached_provider_call("groq", model, {"messages": messages, **params}, live_call)
+
+    @staticmethod
+    def groq_available():
+        """Groq can serve requests when configured or when replaying a cassette"""
+        return groq_client is not None or provider_cassette.replaying
+
+    @staticmethod
+    def select_route(model_choice, module, language, *texts):
+        """Model route for a request from the selected provider, sized by its input text; lighter near the token budget"""
+        provider = "gemini" if model_choice == "Google Gemini" or not ATSAnalyzer.groq_available() else "groq"
+        if token_ledger.budget_state({**accounting_context.get(), "module": module}) != "ok":
+            module = ModelRouter.LIGHT_MODULE
+        return model_router.route(provider, module, language, sum(len(text or "") for text in texts))
+
+    @staticmethod
+    def normalize_text(text):
+        """Collapse whitespace so trivially reformatted inputs compare equal"""
+        return " ".join(str(text or "").split())
+
+    @staticmethod
+    def request_fingerprint(kind, *parts):
+        """Hash of a request's normalized inputs, used to coalesce identical requests"""
+        normalized = [kind] + [ATSAnalyzer.normalize_text(part) if isinstance(part, str) else part for part in parts]
+        return hashlib.sha256(json.dumps(normalized, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def get_ai_response(model_choice, input_prompt, pdf_text, job_description, language="English", structured=False):
+        """Get AI response from selected model, sharing identical in-flight requests"""
+        key = ATSAnalyzer.request_fingerprint("analysis", model_choice, input_prompt, pdf_text, job_description,
+            language, structured)
+        return single_flight.do(key, lambda: ATSAnalyzer.fetch_ai_response(
+            model_choice, input_prompt, pdf_text, job_description, language, structured))
+
+    @staticmethod
+    def fetch_ai_response(model_choice, input_prompt, pdf_text, job_description, language="English", structured=False):
+        """Call the selected model for one analysis"""
         try:
             selected_lang = ATSAnalyzer.get_prompts(language)
+            if structured:
+                input_prompt = input_prompt + ATSAnalyzer.get_structured_prompt(language)
+            route = ATSAnalyzer.select_route(model_choice, accounting_context.get().get("module"), language,
+                pdf_text, job_description)
+
+            with accounting_scope(route=route["name"]):
+                if model_choice == "Google Gemini" or not ATSAnalyzer.groq_available():
+                    response = ATSAnalyzer.get_gemini_response(input_prompt, pdf_text, job_description, language,
+                        model_name=route["model"], max_output_tokens=route["max_tokens"])
+                    ATSAnalyzer.record_route_quality(route["name"], response, structured)
+                    return response
+
+                # For Groq model
+                messages = ATSAnalyzer.format_groq_messages(selected_lang, input_prompt, job_description, pdf_text, language)
+                response = ATSAnalyzer.call_groq(messages,
+                    model=route["model"],
+                    temperature=0.5,
+                    max_tokens=route["max_tokens"],
+                    top_p=1,
+                    frequency_penalty=0,
+                    presence_penalty=0).text
             
-            if model_choice == "Google Gemini":
-                return ATSAnalyzer.get_gemini_response(input_prompt, pdf_text, job_description, language)
-            
-            # For Groq model
-            if groq_client is None:
-                st.error("⚠️ Groq AI is not available. Please use Google Gemini instead.")
-                return ATSAnalyzer.get_gemini_response(input_prompt, pdf_text, job_description, language)
-                
-            messages = ATSAnalyzer.format_groq_messages(selected_lang, input_prompt, job_description, pdf_text, language)
-
-            # Using mistral model with optimized parameters
-            chat_completion = groq_client.chat.completions.create(
-                messages=messages,
-                model="mistral-saba-24b",
-                temperature=0.5,
-                max_tokens=4000,
-                top_p=1,
-                frequency_penalty=0,
-                presence_penalty=0)
-            
-            response = chat_completion.choices[0].message.content
             if not response or len(response.strip()) < 10:
                 raise Exception("Invalid or empty response received")
+            ATSAnalyzer.record_route_quality(route["name"], response, structured)
                 
             # Add language-specific formatting
             return selected_lang["result_prefix"] + response
             
+        except JobCancelledError:
+            raise
         except Exception as e:
             logger.error(f"API Error: {str(e)}")
             return ATSAnalyzer.get_error_message(language)
 
     @staticmethod
-    def get_gemini_response(input_prompt, pdf_text, job_description, language="English"):
-                    try:
-                        if not pdf_text or not job_description:
-                            logger.error("Empty resume text or job description")
-                            st.error("⚠️ Resume text or job description is empty. Please check your inputs.")
-                            return None
-                            
-                        logger.debug("Attempting to initialize Gemini model with gemini-1.5-pro")
-                        try:
-                            model = genai.GenerativeModel("gemini-1.5-pro")
-                            logger.debug("Successfully initialized gemini-1.5-pro model")
-                        except Exception as e1:
-                            logger.debug(f"Failed with gemini-1.5-pro: {str(e1)}")
-                            try:
-                                logger.debug("Attempting to initialize Gemini model with models/gemini-1.5-pro")
-                                model = genai.GenerativeModel("models/gemini-1.5-pro")
-                                logger.debug("Successfully initialized models/gemini-1.5-pro model")
-                            except Exception as e2:
-                                logger.debug(f"Failed with models/gemini-1.5-pro: {str(e2)}")
-                                try:
-                                    logger.debug("Attempting to initialize Gemini model with models/gemini-pro")
-                                    model = genai.GenerativeModel("models/gemini-pro")
-                                    logger.debug("Successfully initialized models/gemini-pro model")
-                                except Exception as e3:
-                                    logger.debug(f"Failed with models/gemini-pro: {str(e3)}")
-                            # Fall back to original format as last resort
-                                    logger.debug("Falling back to gemini-pro")
-                                    model = genai.GenerativeModel("gemini-pro")
-                                    logger.debug("Successfully initialized gemini-pro model")
-                        try:
-                            full_prompt = f"""
-            Task: {input_prompt}
+    def run_analysis(model_choice, analysis_type, doc_text, job_description, language="English", structured=False,
+            sectioned=False):
+        """Run one analysis module, raising instead of returning the localized error message"""
+        # Section-level analysis keeps its own per-section cache, so only whole analyses are reused across near-duplicates
+        near_scope = None
+        if near_duplicates.threshold and not sectioned:
+            near_scope = "|".join((analysis_type, language, model_choice, str(structured),
+                ATSAnalyzer.prompt_hash(analysis_type, language)))
+            fingerprint = near_duplicates.fingerprint(doc_text, job_description)
+            match = near_duplicates.lookup(near_scope, fingerprint, accounting_context.get().get("session"))
+            if match:
+                response, similarity = match
+                logger.info(f"Reusing a near-duplicate {analysis_type} ({similarity:.0%} similar)")
+                return (f"♻️ Reused the analysis of a near-identical resume and job description ({similarity:.0%} similar)\n\n"
+                    + response)
+
+        if token_ledger.budget_state({**accounting_context.get(), "module": analysis_type}) == "exhausted":
+            logger.warning(f"Token budget used up for {analysis_type}; serving the local match estimate")
+            return ATSAnalyzer.local_analysis(doc_text, job_description)
+
+        chunk_chars = int(get_config("SJA_CHUNK_CHARS", 40000))
+        chunked = chunk_chars > 0 and len(doc_text) + len(job_description) > chunk_chars
+        with accounting_scope(kind="analysis", language=language, module=analysis_type, model=model_choice,
+                prompt=ATSAnalyzer.prompt_version(analysis_type, language)):
+            if chunked:
+                key = ATSAnalyzer.request_fingerprint("chunked_analysis", model_choice, analysis_type, doc_text,
+                    job_description, language, structured, chunk_chars)
+                response = single_flight.do(key, lambda: ATSAnalyzer.run_chunked_analysis(model_choice, analysis_type,
+                    doc_text, job_description, language, structured, chunk_chars))
+            elif sectioned:
+                key = ATSAnalyzer.request_fingerprint("sectioned_analysis", model_choice, analysis_type, doc_text,
+                    job_description, language, structured)
+                response = single_flight.do(key, lambda: ATSAnalyzer.run_sectioned_analysis(model_choice, analysis_type,
+                    doc_text, job_description, language, structured))
+            else:
+                response = ATSAnalyzer.get_ai_response(model_choice, ATSAnalyzer.ANALYSIS_TYPES[analysis_type],
+                    doc_text, job_description, language, structured)
+        if not response or response == ATSAnalyzer.get_error_message(language):
+            raise RuntimeError(ATSAnalyzer.get_error_message(language))
+        if near_scope:
+            near_duplicates.add(near_scope, fingerprint, response, accounting_context.get().get("session"))
+
+        # Keep the structured fields so ranking and batch screening can reuse them without reparsing
+        analysis_data = ATSAnalyzer.extract_data_from_response(response)
+        if analysis_data:
+            score_key = "|".join((ATSAnalyzer.hash_text(doc_text), ATSAnalyzer.hash_text(job_description),
+                analysis_type, language, model_choice, ATSAnalyzer.prompt_hash(analysis_type, language)))
+            cache_backend.set("score", score_key, {field: analysis_data[field]
+                for field in ("match_score", "score_found", "strengths", "gaps", "suggestions", "structured")})
+        return response
 
-            Language: {language}
+    @staticmethod
+    def split_sections(text):
+        """Split text at section headings into (section, text) pairs, keeping each heading with its lines"""
+        sections, current, lines = [], "header", []
+        for line in (text or "").splitlines():
+            heading = ATSAnalyzer.SECTION_PATTERN.match(line.strip())
+            if heading:
+                if any(existing.strip() for existing in lines):
+                    sections.append((current, "\n".join(lines)))
+                current, lines = ATSAnalyzer.SECTION_ALIASES[heading.group(1).lower()], []
+            lines.append(line)
+        if any(existing.strip() for existing in lines):
+            sections.append((current, "\n".join(lines)))
+        return sections
 
-            Resume Content:
-            {pdf_text}
+    @staticmethod
+    def chunk_text(text, max_chars):
+        """Pack whole sections (or paragraphs and lines of oversized ones) into chunks of at most max_chars"""
+        pieces = []
+        for _, section in ATSAnalyzer.split_sections(text):
+            if len(section) <= max_chars:
+                pieces.append(section)
+                continue
+            for line in section.splitlines():
+                pieces.extend(line[start:start + max_chars] for start in range(0, max(len(line), 1), max_chars))
+
+        chunks, current = [], ""
+        for piece in pieces:
+            if current and len(current) + len(piece) + 1 > max_chars:
+                chunks.append(current)
+                current = ""
+            current = f"{current}\n{piece}" if current else piece
+        if current.strip():
+            chunks.append(current)
+        return chunks
 
-            Job Description:
-            {job_description}
+    @staticmethod
+    def diff_sections(old_text, new_text):
+        """Per-section changes between two resume versions: section, status and a unified diff of changed lines"""
+        def by_section(text):
+            grouped = {}
+            for section, section_text in ATSAnalyzer.split_sections(text):
+                grouped[section] = f"{grouped[section]}\n{section_text}" if section in grouped else section_text
+            return grouped
+
+        old_sections, new_sections = by_section(old_text), by_section(new_text)
+        changes = []
+        for section in list(new_sections) + [section for section in old_sections if section not in new_sections]:
+            old, new = old_sections.get(section), new_sections.get(section)
+            status = "added" if old is None else "removed" if new is None else "unchanged" if old == new else "changed"
+            diff = "\n".join(difflib.unified_diff((old or "").splitlines(), (new or "").splitlines(), lineterm="", n=0))
+            changes.append({"section": section, "status": status, "diff": diff if status != "unchanged" else ""})
+        return changes
 
-            Please provide a detailed analysis based on the above information.
-            """
-                            logger.debug(f"Sending request to Gemini API with prompt length: {len(full_prompt)}")
-                
-                            # Use a single content string instead of a list
-                            response = model.generate_content(full_prompt)
-                
-                            logger.debug("Successfully received response from Gemini API")
-                            return response.text
-                        except Exception as e:
-                            logger.error(f"Error generating Gemini response: {str(e)}")
-                            st.error(f"Error generating response: {str(e)}")
-                            return None
-                    except Exception as outer_e:
-                        logger.error(f"Unexpected error in get_gemini_response: {str(outer_e)}")
-                        st.error(f"Unexpected error: {str(outer_e)}")
-                        return None
+    @staticmethod
+    def call_model(model_choice, prompt, route, temperature=0.5):
+        """Send a single prompt to the selected provider using the model and output budget of a route"""
+        if model_choice != "Google Gemini" and ATSAnalyzer.groq_available():
+            return ATSAnalyzer.call_groq([{"role": "user", "content": prompt}],
+                model=route["model"], temperature=temperature, max_tokens=route["max_tokens"]).text
+        return ATSAnalyzer.call_gemini(prompt, model_name=route["model"], max_output_tokens=route["max_tokens"]).text
 
-                            
+    @staticmethod
+    def evaluate_chunk(model_choice, analysis_type, chunk, job_description):
+        """Findings for one resume chunk against a JD chunk, cached by the content hash of both"""
+        cache_key = "|".join((ATSAnalyzer.hash_text(chunk), ATSAnalyzer.hash_text(job_description), analysis_type,
+            model_choice, prompt_registry.hash("analysis_types", analysis_type),
+            prompt_registry.hash("tasks", "chunk_analysis")))
+        findings = cache_backend.get("chunk", cache_key)
+        if findings:
+            return findings
+        route = ATSAnalyzer.select_route(model_choice, "Chunk", None, chunk, job_description)
+        with accounting_scope(route=route["name"]):
+            findings = ATSAnalyzer.call_model(model_choice, ATSAnalyzer.CHUNK_ANALYSIS_PROMPT.format(
+                task=ATSAnalyzer.ANALYSIS_TYPES[analysis_type], chunk=chunk, job_description=job_description), route)
+        if findings:
+            cache_backend.set("chunk", cache_key, findings)
+        return findings
+
+    @staticmethod
+    def run_chunked_analysis(model_choice, analysis_type, doc_text, job_description, language="English",
+            structured=False, chunk_chars=40000):
+        """Analyze resume chunks against JD chunks in parallel, then merge the findings into one module output"""
+        jd_chunks = ([job_description] if len(job_description) <= chunk_chars // 2
+            else ATSAnalyzer.chunk_text(job_description, chunk_chars // 2))
+        resume_chunks = ATSAnalyzer.chunk_text(doc_text, chunk_chars - max(len(chunk) for chunk in jd_chunks))
+        pairs = [(resume_chunk, jd_chunk) for resume_chunk in resume_chunks for jd_chunk in jd_chunks]
+        logger.debug(f"Chunked {analysis_type}: {len(resume_chunks)} resume x {len(jd_chunks)} JD chunks")
+
+        findings = ATSAnalyzer.evaluate_chunks(model_choice, analysis_type, pairs)
+        return ATSAnalyzer.merge_findings(model_choice, analysis_type, [f"Part {index}" for index in
+            range(1, len(findings) + 1)], findings, language, structured)
+
+    @staticmethod
+    def run_sectioned_analysis(model_choice, analysis_type, doc_text, job_description, language="English",
+            structured=False):
+        """Evaluate each resume section separately so unchanged sections of a new version come from the chunk cache"""
+        sections = ATSAnalyzer.split_sections(doc_text)
+        findings = ATSAnalyzer.evaluate_chunks(model_choice, analysis_type,
+            [(section_text, job_description) for _, section_text in sections])
+        return ATSAnalyzer.merge_findings(model_choice, analysis_type, [section.title() for section, _ in sections],
+            findings, language, structured)
+
+    @staticmethod
+    def evaluate_chunks(model_choice, analysis_type, pairs):
+        """Evaluate (resume chunk, JD chunk) pairs in parallel, in order"""
+        # Each worker runs in a copy of this context so the calls keep their accounting dimensions
+        with ThreadPoolExecutor(max_workers=int(get_config("SJA_CHUNK_CONCURRENCY", 4))) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, ATSAnalyzer.evaluate_chunk, model_choice,
+                analysis_type, resume_chunk, jd_chunk) for resume_chunk, jd_chunk in pairs]
+            return [future.result() for future in futures]
+
+    @staticmethod
+    def merge_findings(model_choice, analysis_type, labels, findings, language="English", structured=False):
+        """Reduce labelled partial findings into the module's standard output"""
+        if not any(findings):
+            raise RuntimeError(ATSAnalyzer.get_error_message(language))
+        selected_lang = ATSAnalyzer.get_prompts(language)
+        task = ATSAnalyzer.ANALYSIS_TYPES[analysis_type]
+        if structured:
+            task += ATSAnalyzer.get_structured_prompt(language)
+        prompt = selected_lang["system_msg"] + "\n\n" + ATSAnalyzer.CHUNK_REDUCE_PROMPT.format(task=task,
+            language=language, findings="\n\n".join(f"{label}:\n{finding}"
+                for label, finding in zip(labels, findings) if finding))
+        route = ATSAnalyzer.select_route(model_choice, analysis_type, language)
+        with accounting_scope(route=route["name"]):
+            response = ATSAnalyzer.call_model(model_choice, prompt, route)
+        if not response or len(response.strip()) < 10:
+            raise RuntimeError(ATSAnalyzer.get_error_message(language))
+        ATSAnalyzer.record_route_quality(route["name"], response, structured)
+        if model_choice != "Google Gemini" and ATSAnalyzer.groq_available():
+            response = selected_lang["result_prefix"] + response
+        return response
+
+    @staticmethod
+    def record_route_quality(route_name, response, structured=False):
+        """Rate the route that produced a module output by the fields its response delivered"""
+        model_router.record(route_name, quality=ATSAnalyzer.response_quality(
+            ATSAnalyzer.extract_data_from_response(response) if response else None, structured))
+
+    @staticmethod
+    def response_quality(analysis_data, structured=False):
+        """Share of the expected fields a response delivered: the JSON envelope fields, or a match score in the prose"""
+        if not analysis_data:
+            return 0.0
+        if structured:
+            fields = [analysis_data["match_score"], analysis_data["strengths"], analysis_data["gaps"],
+                analysis_data["suggestions"]]
+            return sum(1 for field in fields if field) / len(fields)
+        return 1.0 if analysis_data["score_found"] else 0.0
+
+    @staticmethod
+    def translate_analysis(model_choice, text, source_language, target_language, avoided_input_tokens=0):
+        """Produce a target-language analysis by translating an existing result instead of re-analyzing"""
+        if token_ledger.budget_state({**accounting_context.get(), "module": "Translation"}) == "exhausted":
+            logger.warning(f"Token budget used up; not translating into {target_language}")
+            raise RuntimeError("Token budget for this session is used up, so existing results cannot be translated.")
+        prompt = ATSAnalyzer.TRANSLATION_PROMPT.format(source=source_language, target=target_language, text=text)
+        route = ATSAnalyzer.select_route(model_choice, "Translation", target_language, text)
+        with accounting_scope(kind="translation", language=target_language, route=route["name"]):
+            translated = ATSAnalyzer.call_model(model_choice, prompt, route, temperature=0.2)
+        if not translated or len(translated.strip()) < 10:
+            raise RuntimeError(ATSAnalyzer.get_error_message(target_language))
+        token_ledger.record_savings(target_language, avoided_input_tokens - TokenLedger.estimate_tokens(prompt))
+        return translated
+
+    @staticmethod
+    def get_gemini_response(input_prompt, pdf_text, job_description, language="English", model_name="gemini-1.5-pro",
+            max_output_tokens=None):
+        """Call Gemini for one analysis; runs in job workers, so failures are raised for the job to report"""
+        if not pdf_text or not job_description:
+            raise ValueError("Resume text or job description is empty. Please check your inputs.")
+
+        # Shared documents first, per-module task last, so the prefix is reusable across modules
+        shared_prefix = ATSAnalyzer.build_shared_prefix(pdf_text, job_description,
+            ATSAnalyzer.get_prompts(language)["system_msg"])
+        task_suffix = ATSAnalyzer.render_gemini_task(input_prompt, language)
+        logger.debug(f"Sending request to Gemini API with prompt length: {len(shared_prefix) + len(task_suffix)}")
+
+        response = ATSAnalyzer.call_gemini(task_suffix, model_name=model_name, shared_prefix=shared_prefix,
+            max_output_tokens=max_output_tokens)
+
+        logger.debug("Successfully received response from Gemini API")
+        return response.text
+
+    @staticmethod
+    def hash_text(text):
+        """Short content hash used in result keys"""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def hash_upload(uploaded_file):
+        """Short content hash of an uploaded file, computed once per upload without copying its bytes"""
+        file_id = getattr(uploaded_file, "file_id", None)
+        hashes = st.session_state.setdefault("upload_hashes", {})
+        if file_id is None or file_id not in hashes:
+            file_hash = hashlib.sha256(uploaded_file.getbuffer()).hexdigest()[:16]
+            if file_id is None:
+                return file_hash
+            ATSAnalyzer.store_result(hashes, file_id, file_hash, limit=20)
+        return hashes[file_id]
+
+    @staticmethod
+    def store_result(store, key, value, limit=50):
+        """Insert into a session-scoped store, dropping the oldest entries past the limit"""
+        store.pop(key, None)
+        store[key] = value
+        while len(store) > limit:
+            store.pop(next(iter(store)))
+
+    @staticmethod
+    def get_document_text(uploaded_file):
+        """Extract text from an upload once per session, keyed by file hash"""
+        texts = st.session_state.setdefault("extracted_texts", {})
+        file_hash = ATSAnalyzer.hash_upload(uploaded_file)
+        if file_hash not in texts:
+            # Other sessions and replicas may already have extracted the same file
+            text = cache_backend.get("extract", file_hash)
+            if not text:
+                text = ATSAnalyzer.extract_text(uploaded_file)
+                if not text:
+                    return text
+                cache_backend.set("extract", file_hash, text)
+            ATSAnalyzer.store_result(texts, file_hash, text, limit=5)
+        return texts[file_hash]
 
     @staticmethod
     def extract_text(uploaded_file):
         try:
+            max_upload_mb = float(get_config("SJA_MAX_UPLOAD_MB", 10))
+            if uploaded_file.size > max_upload_mb * 1024 * 1024:
+                st.error(f"⚠️ {uploaded_file.name} is {uploaded_file.size / 1024 / 1024:.1f} MB. "
+                    f"Please upload a file of at most {max_upload_mb:g} MB.")
+                return None
+
             file_type = uploaded_file.name.split('.')[-1].lower()
             if file_type == 'pdf':
+                uploaded_file.seek(0)
                 pdf_reader = PdfReader(uploaded_file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text()
-                return text
+                return "".join(page.extract_text() or "" for page in pdf_reader.pages)
             elif file_type in ['doc', 'docx']:
+                uploaded_file.seek(0)
                 return docx2txt.process(uploaded_file)
             else:
                 st.error("Unsupported file format")
@@ -417,78 +2142,685 @@ Remember to:
             st.error(f"Error extracting text: {str(e)}")
             return None
 
+    @staticmethod
+    def get_structured_prompt(language="English"):
+        """Instruction asking the provider for a JSON envelope alongside the prose"""
+        return f"""
+
+After the analysis, append a JSON object in a ```json fenced block with exactly these keys:
+{{"match_score": <integer 0-100>, "strengths": [<strings>], "gaps": [<strings>], "suggestions": [<strings>]}}
+Keep the JSON keys in English and write the list items in {language}."""
+
+    @staticmethod
+    def parse_score(value):
+        """Convert a score (possibly with Indic digits or a % sign) to a float in 0-100"""
+        try:
+            score = float(str(value).translate(ATSAnalyzer.INDIC_DIGITS).strip().rstrip("%").strip())
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, min(100.0, score))
+
+    @staticmethod
+    def parse_json_envelope(response):
+        """Find the JSON envelope in a response, returning (envelope, prose without the envelope)"""
+        block = ATSAnalyzer.JSON_BLOCK_PATTERN.search(response)
+        if block:
+            candidate, start, end = block.group(1), block.start(), block.end()
+        else:
+            # Tolerate an unfenced object as long as it carries the score key
+            anchor = response.rfind('"match_score"')
+            start = response.rfind("{", 0, anchor) if anchor != -1 else -1
+            if start == -1:
+                return None, response
+            candidate, end = response[start:], None
+
+        decoder = json.JSONDecoder()
+        for text in (candidate, ATSAnalyzer.TRAILING_COMMA_PATTERN.sub(r"\1", candidate)):
+            try:
+                envelope, consumed = decoder.raw_decode(text)
+            except ValueError:
+                continue
+            if isinstance(envelope, dict):
+                end = end if end is not None else start + consumed
+                return envelope, (response[:start] + response[end:]).strip()
+        return None, response
+
     @staticmethod
     def extract_data_from_response(response):
         """Extract structured data from AI response"""
         try:
-            # Extract match score
-            match_pattern = r'Match Score:?\s*(\d+)%'
-            match_result = re.search(match_pattern, response)
-            match_score = float(match_result.group(1)) if match_result else 0
-
-            return {'match_score': match_score,'raw_response': response}
+            envelope, prose = ATSAnalyzer.parse_json_envelope(response)
+            envelope = envelope or {}
+
+            def as_list(value):
+                if isinstance(value, str):
+                    value = [line.strip(" -•*") for line in value.splitlines()]
+                return [str(item).strip() for item in value or [] if str(item).strip()]
+
+            # Extract match score, preferring the envelope over an explicit score label in the prose
+            match_score = ATSAnalyzer.parse_score(envelope.get("match_score"))
+            if match_score is None:
+                match_result = next((match for match in ATSAnalyzer.SCORE_PATTERN.finditer(prose) if match["suffix"]
+                    or re.search(r"%|100", match["unit"] or "")), None)
+                match_score = ATSAnalyzer.parse_score(match_result["score"]) if match_result else None
+
+            return {'match_score': match_score or 0,
+                'score_found': match_score is not None,
+                'strengths': as_list(envelope.get("strengths")),
+                'gaps': as_list(envelope.get("gaps")),
+                'suggestions': as_list(envelope.get("suggestions")),
+                'structured': bool(envelope),
+                'prose': prose,
+                'raw_response': response}
         except Exception as e:
             logger.error(f"Error parsing response: {str(e)}")
             return None
 
+    @staticmethod
+    def fill_placeholders(text, values):
+        """Fill [Placeholder] fields in a single pass, leaving unknown or empty placeholders intact"""
+        def substitute(match):
+            field = ATSAnalyzer.PLACEHOLDER_FIELDS.get(match.group(1).strip().lower())
+            value = values.get(field) if field else None
+            return str(value) if value else match.group(0)
+        return ATSAnalyzer.PLACEHOLDER_PATTERN.sub(substitute, text)
+
+    @staticmethod
+    def compile_template(template):
+        """Split a template once per process into (literal text, placeholder) segments"""
+        def compile_segments():
+            segments, position = [], 0
+            for match in ATSAnalyzer.PLACEHOLDER_PATTERN.finditer(template):
+                segments.append((template[position:match.start()], match.group(1)))
+                position = match.end()
+            segments.append((template[position:], None))
+            return tuple(segments)
+        return prompt_registry.rendered(("template", template), compile_segments)
+
+    @staticmethod
+    def render_template(template, values):
+        """Render a compiled template, keeping placeholders that have no value"""
+        parts = []
+        for literal, placeholder in ATSAnalyzer.compile_template(template):
+            parts.append(literal)
+            if placeholder is not None:
+                value = values.get(ATSAnalyzer.PLACEHOLDER_FIELDS.get(placeholder.strip().lower()))
+                parts.append(str(value) if value else f"[{placeholder}]")
+        return "".join(parts).strip()
+
+    @staticmethod
+    def extract_resume_fields(resume_text):
+        """Extract contact details, education, sections and skills from resume text in one pass over its lines"""
+        fields = {"name": "", "email": "", "phone": "", "linkedin": "", "university": "", "degree": "",
+            "field_of_study": "", "year": "", "skills": [], "sections": {}}
+        skills, sections = {}, {}
+        current_section = "header"
+
+        for line in (resume_text or "").splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            heading = ATSAnalyzer.SECTION_PATTERN.match(line)
+            if heading:
+                current_section = ATSAnalyzer.SECTION_ALIASES[heading.group(1).lower()]
+                continue
+            sections.setdefault(current_section, []).append(line)
+
+            if not fields["name"] and current_section == "header" and len(sections["header"]) == 1 \
+                    and ATSAnalyzer.NAME_PATTERN.match(line):
+                fields["name"] = line.title() if line.isupper() else line
+            if not fields["email"]:
+                email = ATSAnalyzer.EMAIL_PATTERN.search(line)
+                fields["email"] = email.group(0) if email else ""
+            if not fields["phone"]:
+                for phone in ATSAnalyzer.PHONE_PATTERN.finditer(line):
+                    if 10 <= sum(char.isdigit() for char in phone.group(0)) <= 13:
+                        fields["phone"] = phone.group(0).strip()
+                        break
+            if not fields["linkedin"]:
+                profile = ATSAnalyzer.LINKEDIN_PATTERN.search(line)
+                fields["linkedin"] = profile.group(0) if profile else ""
+            if not fields["degree"]:
+                degree = ATSAnalyzer.DEGREE_PATTERN.search(line)
+                if degree:
+                    fields["degree"] = degree.group(0).strip()
+                    fields["field_of_study"] = (degree.group(2) or "").strip()
+            if not fields["university"]:
+                university = ATSAnalyzer.UNIVERSITY_PATTERN.search(line)
+                fields["university"] = university.group(0).strip(" -•\t") if university else ""
+            if not fields["year"]:
+                year = ATSAnalyzer.YEAR_PATTERN.search(line)
+                fields["year"] = year.group(0) if year else ""
+            for skill in ATSAnalyzer.SKILL_PATTERN.findall(line):
+                skills.setdefault(skill.lower(), skill)
+
+        if not fields["linkedin"]:
+            portfolio = ATSAnalyzer.PORTFOLIO_PATTERN.search(resume_text or "")
+            fields["linkedin"] = portfolio.group(0) if portfolio else ""
+        fields["skills"] = list(skills.values())
+        fields["sections"] = {name: "\n".join(lines) for name, lines in sections.items()}
+        return fields
+
+    @staticmethod
+    def get_resume_fields(uploaded_file):
+        """Resume fields for an upload, extracted once per session and keyed by file hash"""
+        fields_store = st.session_state.setdefault("resume_fields", {})
+        file_hash = ATSAnalyzer.hash_upload(uploaded_file)
+        if file_hash not in fields_store:
+            doc_text = ATSAnalyzer.get_document_text(uploaded_file)
+            if not doc_text:
+                return {}
+            ATSAnalyzer.store_result(fields_store, file_hash, ATSAnalyzer.extract_resume_fields(doc_text), limit=5)
+        return fields_store[file_hash]
+
+    @staticmethod
+    def format_resume_facts(fields, section_chars=700):
+        """Compact resume facts for prompts that do not need the full text, or "" when too little was extracted"""
+        sections = fields.get("sections", {})
+        if not (sections.get("experience") or sections.get("projects")):
+            return ""
+        lines = [f"{label}: {fields[key]}" for label, key in (("Name", "name"), ("Degree", "degree"),
+            ("University", "university"), ("Year", "year")) if fields.get(key)]
+        if fields.get("skills"):
+            lines.append(f"Skills: {', '.join(fields['skills'])}")
+        for label, key in (("Summary", "summary"), ("Experience", "experience"), ("Projects", "projects"),
+                ("Achievements", "achievements")):
+            if sections.get(key):
+                lines.append(f"{label}:\n{sections[key][:section_chars]}")
+        return "\n\n".join(lines)
+
+    @staticmethod
+    def extract_local_facts(resume_text, job_description="", resume_fields=None):
+        """Combine extracted resume fields with the skills and company name found in the JD"""
+        fields = resume_fields or ATSAnalyzer.extract_resume_fields(resume_text)
+        job_description = job_description or ""
+
+        resume_skills = fields["skills"]
+        jd_skills = list({skill.lower(): skill for skill in ATSAnalyzer.SKILL_PATTERN.findall(job_description)}.values())
+        jd_skill_set = {skill.lower() for skill in jd_skills}
+        # Lead with the skills the job asks for, then the rest of the resume skills
+        matched_skills = [skill for skill in resume_skills if skill.lower() in jd_skill_set]
+        skills = matched_skills + [skill for skill in resume_skills if skill.lower() not in jd_skill_set]
+
+        facts = {key: fields[key] for key in ("degree", "field_of_study", "university", "year") if fields[key]}
+        facts.update({"skills": ", ".join(skills[:4]),
+            "field": (jd_skills or resume_skills or [""])[0],
+            "resume_skills": resume_skills,
+            "jd_skills": jd_skills,
+            "matched_skills": matched_skills})
+        company = ATSAnalyzer.COMPANY_PATTERN.search(job_description)
+        if company:
+            facts["company"] = (company.group(1) or company.group(2)).strip(" .")
+        return facts
+
+    @staticmethod
+    def local_match_score(resume_text, job_description):
+        """Instant 0-100 estimate: share of the JD's known skills (or content words) that appear in the resume"""
+        jd_terms = {skill.lower() for skill in ATSAnalyzer.SKILL_PATTERN.findall(job_description or "")}
+        resume_terms = {skill.lower() for skill in ATSAnalyzer.SKILL_PATTERN.findall(resume_text or "")}
+        if not jd_terms:
+            # No known skills in the JD; fall back to overlap of longer words
+            jd_terms = set(re.findall(r"\b[a-z]{5,}\b", (job_description or "").lower()))
+            resume_terms = set(re.findall(r"\b[a-z]{5,}\b", (resume_text or "").lower()))
+        return 100.0 * len(jd_terms & resume_terms) / len(jd_terms) if jd_terms else 0.0
+
+    @staticmethod
+    def local_analysis(resume_text, job_description):
+        """Analysis built only from the local skill match, served once the session's token budget is used up"""
+        facts = ATSAnalyzer.extract_local_facts(resume_text, job_description)
+        matched = {skill.lower() for skill in facts["matched_skills"]}
+        missing = [skill for skill in facts["jd_skills"] if skill.lower() not in matched]
+        envelope = {"match_score": round(ATSAnalyzer.local_match_score(resume_text, job_description)),
+            "strengths": facts["matched_skills"][:5],
+            "gaps": missing[:5],
+            "suggestions": [f"Show concrete experience with {skill}" for skill in missing[:3]]}
+        return ("⚠️ Token budget reached: this is a local keyword estimate, not an AI analysis.\n\n"
+            f"Match Score: {envelope['match_score']}%\n\n```json\n{json.dumps(envelope, ensure_ascii=False)}\n```")
+
+    @staticmethod
+    def render_local_draft(cold_mail_type, personal_info, facts):
+        """Instant cold mail draft from the selected template, personal information and local facts"""
+        values = {**facts, **{key: value for key, value in personal_info.items() if value}}
+        return ATSAnalyzer.render_template(ATSAnalyzer.COLD_MAIL_TYPES[cold_mail_type]["template"], values)
+
     @staticmethod
     def generate_cold_mail(model_choice, prompt, resume_text, job_description, personal_info):
-        """Generate a cold mail using the selected AI model"""
+        """Generate a cold mail using the selected AI model, sharing identical in-flight requests"""
+        if token_ledger.budget_state({**accounting_context.get(), "module": "Cold Mail"}) == "exhausted":
+            raise RuntimeError("Token budget for this session is used up. Use the ⚡ Instant local draft instead.")
+        key = ATSAnalyzer.request_fingerprint("cold_mail", model_choice, prompt, resume_text, job_description,
+            json.dumps(personal_info, sort_keys=True))
+        return single_flight.do(key, lambda: ATSAnalyzer.fetch_cold_mail(
+            model_choice, prompt, resume_text, job_description, personal_info))
+
+    @staticmethod
+    def fetch_cold_mail(model_choice, prompt, resume_text, job_description, personal_info):
+        """Call the selected model for one cold mail"""
         try:
-            if model_choice == "Google Gemini":
-                try:
-                    model = genai.GenerativeModel("gemini-1.5-pro")
-                except Exception as e1:
-                    try:
-                        model = genai.GenerativeModel("models/gemini-1.5-pro")
-                    except Exception as e2:
-                        try:
-                            model = genai.GenerativeModel("models/gemini-pro")
-                        except Exception as e3:
-                            # Fall back to original format as last resort
-                            model = genai.GenerativeModel("gemini-pro")
-                            
-                response = model.generate_content([prompt, resume_text, job_description])
-                generated_content = response.text
-            else:
-                if groq_client is None:
-                    st.error("⚠️ Groq AI is not available. Please use Google Gemini instead.")
-                    try:
-                        model = genai.GenerativeModel("gemini-1.5-pro")
-                    except Exception as e1:
-                        try:
-                            model = genai.GenerativeModel("models/gemini-1.5-pro")
-                        except Exception as e2:
-                            try:
-                                model = genai.GenerativeModel("models/gemini-pro")
-                            except Exception as e3:
-                            # Fall back to original format as last resort
-                                model = genai.GenerativeModel("gemini-pro")
-                            
-                    response = model.generate_content([prompt, resume_text, job_description])
-                    generated_content = response.text
-                else: 
-                    chat_completion = groq_client.chat.completions.create(
-                        messages=[
-                            {"role": "user","content": f"{prompt}\n\nResume:\n{resume_text}\n\nJob Description:\n{job_description}"}],
-                        model="mistral-saba-24b",
-                        temperature=0.5,)
-                    generated_content = chat_completion.choices[0].message.content
+            if model_choice != "Google Gemini" and not ATSAnalyzer.groq_available():
+                model_choice = "Google Gemini"
+
+            with accounting_scope(kind="cold_mail", module="Cold Mail"):
+                route = ATSAnalyzer.select_route(model_choice, "Cold Mail", None, resume_text, job_description)
+            with accounting_scope(kind="cold_mail", module="Cold Mail", route=route["name"]):
+                if model_choice == "Google Gemini":
+                    generated_content = ATSAnalyzer.call_gemini(prompt, model_name=route["model"],
+                        shared_prefix=ATSAnalyzer.build_shared_prefix(resume_text, job_description),
+                        max_output_tokens=route["max_tokens"]).text
+                else:
+                    generated_content = ATSAnalyzer.call_groq(
+                        [{"role": "user","content": ATSAnalyzer.build_shared_prefix(resume_text, job_description)},
+                            {"role": "user","content": prompt}],
+                        model=route["model"],
+                        max_tokens=route["max_tokens"],
+                        temperature=0.5).text
 
             # Replace basic placeholders with personal information
-            generated_content = generated_content.replace("[Your Name]", personal_info.get("name", "[Your Name]"))
-            generated_content = generated_content.replace("[Your Email Address]", personal_info.get("email", "[Your Email]"))
-            generated_content = generated_content.replace("[Your Phone Number]", personal_info.get("phone", "[Your Phone]"))
-            generated_content = generated_content.replace("[Your College/University Name]", personal_info.get("university", "[Your University]"))
-            generated_content = generated_content.replace("[LinkedIn Profile or Portfolio link]", personal_info.get("linkedin", "[Your LinkedIn]"))
-            generated_content = generated_content.replace("[Your Degree]", personal_info.get("degree", "[Your Degree]"))
+            generated_content = ATSAnalyzer.fill_placeholders(generated_content, personal_info)
 
             return generated_content
 
+        except JobCancelledError:
+            raise
         except Exception as e:
             logger.error(f"Error generating cold mail: {str(e)}")
             return None
 
+    @staticmethod
+    def parse_bulk_csv(csv_bytes):
+        """Read bulk outreach rows (company, recipient_name, role, job_description) from CSV bytes"""
+        rows = []
+        for record in csv.DictReader(io.StringIO(csv_bytes.decode("utf-8-sig"))):
+            normalized = {re.sub(r"\W+", "_", (key or "").strip().lower()).strip("_"): (value or "").strip()
+                for key, value in record.items() if isinstance(value, str)}
+            row = {field: next((normalized[alias] for alias in aliases if normalized.get(alias)), "")
+                for field, aliases in ATSAnalyzer.BULK_CSV_COLUMNS.items()}
+            if row["company"] and row["job_description"]:
+                rows.append(row)
+        return rows
+
+    @staticmethod
+    def generate_bulk_cold_mails(model_choice, template, resume_text, rows, personal_info, max_workers=4):
+        """Generate one cold mail per row concurrently under the shared rate limit, yielding (index, mail) as they finish"""
+        rate_limiter = get_bulk_rate_limiter()
+
+        def generate(row):
+            rate_limiter.acquire()
+            prompt = f"""{template}
+
+Target Company: {row["company"]}
+Recipient: {row["recipient_name"] or "Hiring Manager"}
+Role: {row["role"] or "the advertised role"}"""
+            try:
+                return ATSAnalyzer.generate_cold_mail(model_choice, prompt, resume_text, row["job_description"],
+                    {**personal_info, **row})
+            except RuntimeError as e:
+                # A budget used up mid-run skips the remaining rows but keeps the mails already generated
+                logger.warning(f"Bulk cold mail for {row['company']} skipped: {str(e)}")
+                return None
+
+        # Each worker runs in a copy of this context so the mails are charged to (and budgeted for) the session
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(contextvars.copy_context().run, generate, row): index
+                for index, row in enumerate(rows)}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    @staticmethod
+    def run_bulk_cold_mails(model_choice, template, resume_text, rows, personal_info, max_workers=4, report=None):
+        """Generate all bulk cold mails as one background job, reporting progress as each finishes"""
+        mails = [None] * len(rows)
+        for done, (index, mail) in enumerate(ATSAnalyzer.generate_bulk_cold_mails(
+                model_choice, template, resume_text, rows, personal_info, max_workers), start=1):
+            mails[index] = mail
+            if report:
+                report(done / len(rows), f"✉️ {done}/{len(rows)} • {rows[index]['company']}")
+        return rows, mails
+
+    @staticmethod
+    def build_bulk_exports(rows, mails):
+        """CSV and zip payloads for a bulk cold mail run"""
+        csv_buffer = io.StringIO()
+        writer = csv.writer(csv_buffer)
+        writer.writerow(["company", "recipient_name", "role", "cold_mail"])
+        for row, mail in zip(rows, mails):
+            writer.writerow([row["company"], row["recipient_name"], row["role"], mail or ""])
+        csv_data = csv_buffer.getvalue()
+
+        zip_buffer = io.BytesIO()
+        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            for index, (row, mail) in enumerate(zip(rows, mails), start=1):
+                if mail:
+                    slug = re.sub(r"[^A-Za-z0-9]+", "_", row["company"]).strip("_") or "company"
+                    archive.writestr(f"{index:03d}_{slug}.txt", mail)
+            archive.writestr("cold_mails.csv", csv_data)
+        return csv_data, zip_buffer.getvalue()
+
+    @staticmethod
+    def build_analysis_report(resume_name, language, model_choice, results, translated_from=None):
+        """Report dict for stored module results ({module: response}); never calls a provider"""
+        modules = []
+        for module, response in results.items():
+            analysis_data = ATSAnalyzer.extract_data_from_response(response) or {}
+            modules.append({"module": module,
+                "match_score": analysis_data["match_score"] if analysis_data.get("score_found") else None,
+                "strengths": analysis_data.get("strengths", []),
+                "gaps": analysis_data.get("gaps", []),
+                "suggestions": analysis_data.get("suggestions", []),
+                "translated_from": (translated_from or {}).get(module),
+                "analysis": analysis_data.get("prose", response)})
+        return {"title": "Resume Analysis Report", "resume": resume_name, "language": language,
+            "model": model_choice, "generated": datetime.now().isoformat(timespec="seconds"), "modules": modules}
+
+    @staticmethod
+    def report_blocks(report):
+        """Flatten a report into (kind, text) blocks shared by the document renderers"""
+        blocks = [("title", report["title"]),
+            ("body", f"Resume: {report['resume']} | Language: {report['language']} | Model: {report['model']} | "
+                f"Generated: {report['generated']}")]
+        for module in report["modules"]:
+            blocks.append(("heading", module["module"]))
+            if module["match_score"] is not None:
+                blocks.append(("body", f"Match Score: {module['match_score']:.0f}%"))
+            if module["translated_from"]:
+                blocks.append(("body", f"Translated from the {module['translated_from']} analysis"))
+            for field in ("strengths", "gaps", "suggestions"):
+                if module[field]:
+                    blocks.append(("subheading", field.title()))
+                    blocks.extend(("bullet", item) for item in module[field])
+            blocks.extend(("body", line) for line in module["analysis"].splitlines() if line.strip())
+        return blocks
+
+    @staticmethod
+    def render_markdown_report(report):
+        prefixes = {"title": "# ", "heading": "\n## ", "subheading": "\n### ", "bullet": "- ", "body": ""}
+        return "\n".join(prefixes[kind] + text for kind, text in ATSAnalyzer.report_blocks(report)) + "\n"
+
+    @staticmethod
+    def render_docx_report(report):
+        """Minimal WordprocessingML package, so DOCX export needs no extra dependency"""
+        run_properties = {"title": "<w:b/><w:sz w:val=\"36\"/>", "heading": "<w:b/><w:sz w:val=\"28\"/>",
+            "subheading": "<w:b/><w:sz w:val=\"24\"/>", "bullet": "", "body": ""}
+        paragraphs = "".join(f'<w:p><w:r><w:rPr>{run_properties[kind]}</w:rPr><w:t xml:space="preserve">'
+            f'{"• " if kind == "bullet" else ""}{xml_escape(text)}</w:t></w:r></w:p>'
+            for kind, text in ATSAnalyzer.report_blocks(report))
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as package:
+            package.writestr("[Content_Types].xml", '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                '<Default Extension="xml" ContentType="application/xml"/>'
+                '<Override PartName="/word/document.xml" '
+                'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/></Types>')
+            package.writestr("_rels/.rels", '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                '<Relationship Id="rId1" Target="word/document.xml" '
+                'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/></Relationships>')
+            package.writestr("word/document.xml", '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                f'<w:body>{paragraphs}</w:body></w:document>')
+        return buffer.getvalue()
+
+    @staticmethod
+    def render_pdf_report(report):
+        """PDF via fpdf2; Hindi and Telugu need a Unicode TTF font configured in SJA_PDF_FONT"""
+        pdf = FPDF()
+        pdf.set_auto_page_break(auto=True, margin=15)
+        pdf.add_page()
+        font_path = get_config("SJA_PDF_FONT")
+        if font_path:
+            pdf.add_font("ReportFont", "", font_path)
+            # Shape Indic scripts when the optional text shaping engine is available
+            try:
+                pdf.set_text_shaping(True)
+            except Exception:
+                pass
+        sizes = {"title": 18, "heading": 14, "subheading": 12, "bullet": 11, "body": 11}
+        for kind, text in ATSAnalyzer.report_blocks(report):
+            bold = kind in ("title", "heading", "subheading")
+            pdf.set_font("ReportFont" if font_path else "Helvetica", "" if font_path else "B" if bold else "",
+                sizes[kind])
+            text = f"- {text}" if kind == "bullet" else text
+            if not font_path:
+                # Core PDF fonts only cover Latin-1
+                text = text.encode("latin-1", "replace").decode("latin-1")
+            pdf.multi_cell(0, sizes[kind] * 0.5, text, new_x="LMARGIN", new_y="NEXT")
+            if bold:
+                pdf.ln(1)
+        return bytes(pdf.output())
+
+    @staticmethod
+    def export_formats():
+        """Export formats whose renderer is available in this deployment"""
+        return [name for name in ATSAnalyzer.EXPORT_FORMATS if name != "PDF" or FPDF is not None]
+
+    @staticmethod
+    def export_report(report, export_format):
+        """Render a report in one of EXPORT_FORMATS, returning bytes"""
+        if export_format == "Markdown":
+            return ATSAnalyzer.render_markdown_report(report).encode("utf-8")
+        if export_format == "JSON":
+            return json.dumps(report, ensure_ascii=False, indent=2).encode("utf-8")
+        if export_format == "DOCX":
+            return ATSAnalyzer.render_docx_report(report)
+        if export_format == "PDF":
+            return ATSAnalyzer.render_pdf_report(report)
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+def submit_session_job(label, store_name, store_key, fn, *args, **kwargs):
+    """Run fn in the job queue and deliver its result to st.session_state[store_name][store_key]"""
+    session_jobs = st.session_state.setdefault("jobs", {})
+    if any(tracked["store"] == store_name and tracked["key"] == store_key for tracked in session_jobs.values()):
+        return None
+    try:
+        # Fragment reruns run outside run_app's accounting scope, so the session is passed explicitly
+        job_id = job_queue.submit(label, fn, *args, session=session_id(), **kwargs)
+    except QueueFullError as e:
+        st.warning(f"🚦 {label} was not started: {str(e)}")
+        return None
+    session_jobs[job_id] = {"label": label, "store": store_name, "key": store_key}
+    return job_id
+
+def pending_session_keys(store_name):
+    """Store keys of this session's jobs that have not been collected yet"""
+    return {tracked["key"] for tracked in st.session_state.get("jobs", {}).values() if tracked["store"] == store_name}
+
+def collect_session_jobs():
+    """Move finished job results into their session stores and report failures"""
+    session_jobs = st.session_state.setdefault("jobs", {})
+    for job_id, tracked in list(session_jobs.items()):
+        job = job_queue.get(job_id)
+        if job is None:
+            st.warning(f"⚠️ {tracked['label']} expired before it finished. Please try again.")
+        elif job["status"] == "done":
+            if job["result"]:
+                ATSAnalyzer.store_result(st.session_state.setdefault(tracked["store"], {}), tracked["key"], job["result"])
+            else:
+                st.error(f"⚠️ {tracked['label']} did not return a result. Please try again.")
+        elif job["status"] in ("failed", "cancelled"):
+            st.error(f"⚠️ {tracked['label']} failed: {job['error'] or job['status']}")
+        else:
+            continue
+        job_queue.release(job_id)
+        del session_jobs[job_id]
+
+def track_upload(uploaded_file):
+    """Note a file an uploader holds in this script run, for the session memory figures; returns the file"""
+    if uploaded_file is not None:
+        file_id = getattr(uploaded_file, "file_id", uploaded_file.name)
+        st.session_state.setdefault("upload_sizes", {})[file_id] = uploaded_file.size
+    return uploaded_file
+
+def session_memory_usage():
+    """Approximate bytes this session holds in uploads, extracted text and stored results"""
+    def size_of(value):
+        if isinstance(value, (list, tuple)):
+            return sys.getsizeof(value) + sum(size_of(item) for item in value)
+        if isinstance(value, dict):
+            return sys.getsizeof(value) + sum(size_of(item) for item in value.values())
+        return sys.getsizeof(value)
+
+    state = st.session_state
+    return {"uploads": sum(state.get("upload_sizes", {}).values()),
+        "extracted_text": size_of(state.get("extracted_texts", {})) + size_of(state.get("resume_fields", {})),
+        "results": sum(size_of(state.get(store, {})) for store in ("analysis_results", "cold_mails", "bulk_cold_mails", "exports"))}
+
+def render_job_progress():
+    """Progress bars for this session's unfinished jobs; True when one has finished since the last collection"""
+    finished = False
+    for job_id, tracked in list(st.session_state.get("jobs", {}).items()):
+        job = job_queue.get(job_id)
+        if job is None or job["finished"]:
+            finished = True
+            continue
+        status = "⚙️ Running"
+        if job["status"] == "queued":
+            position = job_queue.position(job_id)
+            wait = job_queue.estimated_wait(position) if position else None
+            status = f"⏳ #{position} in line" if position else "⏳ Queued"
+            if wait:
+                status += f", about {wait:.0f}s"
+        st.progress(job["progress"], text=f"{status} • {tracked['label']} {job['progress_text']}")
+    return finished
+
+def use_job_posting(posting, description_key, title_key=None):
+    """Copy a matched posting into the job description (and title) inputs before they are rendered"""
+    st.session_state[description_key] = posting["description"]
+    if title_key:
+        st.session_state[title_key] = posting["title"]
+
+def job_postings_panel(uploaded_file, description_key, title_key=None):
+    """Top postings from the local corpus for the uploaded resume, each usable as the job description"""
+    corpus_path = get_config("SJA_JOBS_CORPUS")
+    if corpus_path and job_index.needs_sync(corpus_path):
+        submit_session_job("📥 Job postings", "job_ingests", corpus_path, job_index.sync_file, corpus_path)
+
+    with st.expander(f"🔎 Matching job postings ({job_index.size:,} indexed)"):
+        postings_file = track_upload(st.file_uploader("Add job postings (JSONL or CSV)", type=["jsonl", "json", "csv"],
+            key=f"{description_key}_postings", help="One posting per line or row with title, company, location, url and description"))
+        if postings_file:
+            upload_hash = ATSAnalyzer.hash_upload(postings_file)
+            ingested = st.session_state.get("job_ingests", {}).get(upload_hash)
+            if ingested:
+                st.caption(f"📥 {postings_file.name}: {ingested['added']:,} added, {ingested['updated']:,} updated, "
+                    f"{ingested['unchanged']:,} unchanged, {ingested['skipped']:,} skipped")
+            else:
+                submit_session_job(f"📥 {postings_file.name}", "job_ingests", upload_hash, job_index.ingest_upload,
+                    postings_file.getvalue(), postings_file.name)
+        if not uploaded_file:
+            st.caption("Upload your resume to see the best matching postings.")
+            return
+        resume_text = ATSAnalyzer.get_document_text(uploaded_file)
+        if not resume_text or not job_index.size:
+            return
+
+        # Matches are kept per (resume, index version) so reruns do not repeat the search
+        match_key = (ATSAnalyzer.hash_upload(uploaded_file), job_index.version)
+        matches = st.session_state.get("job_matches", {}).get(match_key)
+        if matches is None:
+            matches = job_index.search(resume_text, k=int(get_config("SJA_JOBS_TOP_K", 10)))
+            st.session_state["job_matches"] = {match_key: matches}
+        for posting in matches:
+            info_col, use_col = st.columns([4, 1])
+            details = " • ".join(part for part in (posting["company"], posting["location"]) if part)
+            skills = ", ".join(posting["matched_skills"][:6])
+            title = f"[{posting['title'] or 'Untitled posting'}]({posting['url']})" if posting["url"] else (
+                posting["title"] or "Untitled posting")
+            info_col.markdown(f"**{title}** {details}  \n🎯 {skills or 'no shared skills'} • relevance {posting['score']:.1f}")
+            use_col.button("Use", key=f"{description_key}_use_{posting['id']}", use_container_width=True,
+                on_click=use_job_posting, args=(posting, description_key, title_key))
+
+@st.fragment(run_every=1.0)
+def job_status_panel():
+    """Show this session's running jobs and rerun the app as soon as one finishes"""
+    if render_job_progress():
+        st.rerun()
+
+def render_analysis_results(analysis_context, analysis_types, result_keys, selected_language, model_choice, polling=False):
+    """Results, version diff, downloads and exports for the analyzer; reruns on its own as a fragment"""
+    with rerun_stats.track("results panel"):
+        if polling:
+            # Deliver finished jobs here so results appear without rerunning the whole app
+            collect_session_jobs()
+            if not st.session_state.get("jobs"):
+                st.rerun()
+        result_store = st.session_state.setdefault("analysis_results", {})
+        file_hash = analysis_context[0]
+        computed_types = [at for at in analysis_types if result_keys[at] in result_store]
+        if computed_types:
+            st.markdown("## 📊 Analysis Results")
+        # Latest earlier version of the resume that has results for the same JD and settings
+        previous_hash = next((version for version in reversed(st.session_state.get("resume_versions", {}))
+            if version != file_hash and any((version, *key[1:]) in result_store for key in result_keys.values())), None)
+        for analysis_type in computed_types:
+            response = result_store[result_keys[analysis_type]]
+            # Use the class method instead of global function
+            analysis_data = ATSAnalyzer.extract_data_from_response(response)
+            if analysis_data:
+                if analysis_data["score_found"]:
+                    previous_result = result_store.get((previous_hash, *result_keys[analysis_type][1:]))
+                    previous_data = ATSAnalyzer.extract_data_from_response(previous_result) if previous_result else None
+                    if previous_data and not previous_data["score_found"]:
+                        previous_data = None
+                    st.metric("Match Score", f"{analysis_data['match_score']:.0f}%",
+                        delta=f"{analysis_data['match_score'] - previous_data['match_score']:+.0f} pts vs previous version"
+                            if previous_data else None)
+
+                # Display analysis results in text format
+                st.markdown(f"### 📝 {analysis_type}")
+                source_language = st.session_state.get("translated_from", {}).get(result_keys[analysis_type])
+                if source_language:
+                    st.caption(f"🌐 Translated from the {source_language} analysis")
+                st.markdown(analysis_data["prose"])
+
+        previous_text = previous_hash and (st.session_state.get("extracted_texts", {}).get(previous_hash)
+            or cache_backend.get("extract", previous_hash))
+        current_text = previous_text and (st.session_state.get("extracted_texts", {}).get(file_hash)
+            or cache_backend.get("extract", file_hash))
+        if computed_types and previous_text and current_text:
+            previous_name = st.session_state["resume_versions"][previous_hash]
+            with st.expander(f"🔀 Changes since previous version ({previous_name})"):
+                for change in ATSAnalyzer.diff_sections(previous_text, current_text):
+                    icon = {"unchanged": "✅", "changed": "✏️", "added": "➕", "removed": "➖"}[change["status"]]
+                    st.markdown(f"{icon} **{change['section'].title()}**: {change['status']}")
+                    if change["diff"]:
+                        st.code(change["diff"], language="diff")
+
+        if computed_types:
+            # Download button for complete analysis, built from the stored results
+            st.download_button("📥 Download Complete Analysis",
+                "\n\n".join([f"=== {at} ===\n{result_store[result_keys[at]]}" for at in computed_types]),
+                file_name=f"resume_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
+                mime="text/plain")
+
+            # Reports are rendered from the stored results in the job queue, once per result set and format
+            export_col, prepare_col = st.columns([2, 1])
+            export_format = export_col.selectbox("📑 Report format", ATSAnalyzer.export_formats())
+            export_store = st.session_state.setdefault("exports", {})
+            export_key = (ATSAnalyzer.hash_text(json.dumps([result_keys[at] for at in computed_types])), export_format)
+            if export_key in export_store:
+                extension, mime = ATSAnalyzer.EXPORT_FORMATS[export_format]
+                prepare_col.download_button(f"📥 Download {export_format}", export_store[export_key],
+                    file_name=f"resume_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}",
+                    mime=mime, use_container_width=True)
+            elif export_key in pending_session_keys("exports"):
+                prepare_col.caption(f"⏳ Preparing {export_format} report...")
+            elif prepare_col.button("📦 Prepare export", use_container_width=True):
+                translated_from = st.session_state.get("translated_from", {})
+                report = ATSAnalyzer.build_analysis_report(analysis_context[2], selected_language, model_choice,
+                    {at: result_store[result_keys[at]] for at in computed_types},
+                    {at: translated_from.get(result_keys[at]) for at in computed_types})
+                submit_session_job(f"📦 {export_format} report", "exports", export_key,
+                    ATSAnalyzer.export_report, report, export_format)
+                # Rerun the app so the panel switches to polling for the export job
+                st.rerun()
+        if polling:
+            render_job_progress()
+
+analysis_results_panel = st.fragment(render_analysis_results)
+# While this session has jobs the panel polls for their results; the last one to finish triggers a full rerun
+analysis_results_polling_panel = st.fragment(run_every=1.0)(render_analysis_results)
+
 def main():
     # Theme configuration
     st.markdown("""
@@ -1202,6 +3534,9 @@ def main():
         </style>
     """, unsafe_allow_html=True)
 
+    # Deliver results of background jobs that finished since the last rerun
+    collect_session_jobs()
+
     # Sidebar
     with st.sidebar:
         st.markdown("""
@@ -1243,6 +3578,15 @@ def main():
             model_choice = st.selectbox("SELECT AI MODEL",
                 list(ATSAnalyzer.AI_MODELS.keys()),
                 format_func=lambda x: ATSAnalyzer.AI_MODELS[x])
+
+            structured_results = st.toggle("🧩 Structured results", value=True,
+                help="Ask the model for a JSON summary (score, strengths, gaps, suggestions) alongside the analysis")
+            translate_results = st.toggle("🌐 Translate existing results", value=True,
+                help="When switching language, translate an analysis already computed in another language instead of re-running it")
+            sectioned_results = st.toggle("🧱 Section-level analysis", value=False,
+                help="Evaluate each resume section separately so a new version only re-evaluates the sections that changed")
+            speculative = st.toggle("🔮 Speculative prefetch", value=False,
+                help="Start the Complete Analysis in the background as soon as a resume and job description are present")
         else:
             st.markdown("<p style='color: #0066cc; margin-top: 20px;'>Choose your preferred AI MODEL</p>", unsafe_allow_html=True)
             
@@ -1251,6 +3595,13 @@ def main():
                 list(ATSAnalyzer.AI_MODELS.keys()),
                 format_func=lambda x: ATSAnalyzer.AI_MODELS[x])
 
+            compact_resume = st.toggle("📉 Compact resume facts", value=True,
+                help="Send the extracted resume facts instead of the full resume text when generating cold mails")
+
+        # Provider calls run in job workers, which cannot draw on the page; warn about the fallback here instead
+        if model_choice != "Google Gemini" and not ATSAnalyzer.groq_available():
+            st.warning("⚠️ Groq AI is not available, so Google Gemini will be used instead.")
+
     # Get language-specific labels
     labels = ATSAnalyzer.LANGUAGE_PROMPTS[selected_language]["labels"] if page == "Smart Resume Analyzer" else ATSAnalyzer.LANGUAGE_PROMPTS["English"]["labels"]
     
@@ -1270,48 +3621,96 @@ def main():
 
         with col1:
             st.subheader("📝 Job Description Details")
-            job_title = st.text_input("Job Title (Optional)", placeholder="e.g., Software Engineer (optional)")
+            job_title = st.text_input("Job Title (Optional)", placeholder="e.g., Software Engineer (optional)",
+                key="analysis_job_title")
             job_description = st.text_area("Job Description",
                 height=200,
+                key="analysis_job_description",
                 placeholder="Paste the job description here...")
 
         with col2:
             st.subheader("📄 Your Resume")
-            uploaded_file = st.file_uploader("Upload your resume (PDF, DOC, DOCX)",
-                type=["pdf", "doc", "docx"])
+            uploaded_file = track_upload(st.file_uploader("Upload your resume (PDF, DOC, DOCX)",
+                type=["pdf", "doc", "docx"]))
 
             if uploaded_file:
                 st.markdown(f'<p class="success-message">✅ {uploaded_file.name} uploaded successfully!</p>', unsafe_allow_html=True)
 
+        if job_index:
+            job_postings_panel(uploaded_file, "analysis_job_description", "analysis_job_title")
+
         # Analysis section
-        if uploaded_file and job_description and analysis_types:
-            if st.button(labels["analyze"], use_container_width=True):
-                doc_text = ATSAnalyzer.extract_text(uploaded_file)
+        # Results are kept per (file, JD, module, language, model) so reruns re-render instantly
+        result_store = st.session_state.setdefault("analysis_results", {})
+        if uploaded_file and job_description:
+            analysis_context = (ATSAnalyzer.hash_upload(uploaded_file), ATSAnalyzer.hash_text(job_description), uploaded_file.name)
+            st.session_state["analysis_context"] = analysis_context
+            # Resume versions uploaded in this session, oldest first, for the version diff
+            resume_versions = st.session_state.setdefault("resume_versions", {})
+            if analysis_context[0] not in resume_versions:
+                ATSAnalyzer.store_result(resume_versions, analysis_context[0], uploaded_file.name, limit=5)
+        else:
+            # Inputs are cleared when switching pages; keep showing the last analysed documents
+            analysis_context = st.session_state.get("analysis_context")
+            if analysis_context:
+                st.caption(f"Showing results for the last analysed resume: {analysis_context[2]}")
+
+        speculation = st.session_state.setdefault("speculation", {})
+        if speculative and uploaded_file and job_description:
+            # Extraction, the local score and the default module start before the click; the provider
+            # response lands in the shared caches, so the click finds it done (or joins it in flight)
+            doc_text = ATSAnalyzer.get_document_text(uploaded_file)
+            if doc_text:
+                st.caption(f"⚡ Local keyword match: {ATSAnalyzer.local_match_score(doc_text, job_description):.0f}% "
+                    "(instant estimate while the AI analysis is prepared)")
+                speculative_key = (analysis_context[0], analysis_context[1], "Complete Analysis", selected_language,
+                    model_choice, structured_results)
+                if speculative_key not in result_store:
+                    speculative_prefetch.start(speculation, speculative_key, "🔮 Complete Analysis",
+                        ATSAnalyzer.run_analysis, model_choice, "Complete Analysis", doc_text, job_description,
+                        selected_language, structured_results, sectioned_results)
+        elif speculation:
+            speculative_prefetch.abandon(speculation)
+
+        if analysis_context and analysis_types:
+            file_hash, jd_hash, _ = analysis_context
+            result_keys = {at: (file_hash, jd_hash, at, selected_language, model_choice, structured_results) for at in analysis_types}
+            running_keys = pending_session_keys("analysis_results")
+            pending_types = [at for at in analysis_types
+                if result_keys[at] not in result_store and result_keys[at] not in running_keys]
+
+            if uploaded_file and job_description and st.button(labels["analyze"], use_container_width=True) and pending_types:
+                doc_text = ATSAnalyzer.get_document_text(uploaded_file)
                 
                 if doc_text:
-                    for analysis_type in analysis_types:
-                        with st.spinner(f"Performing {analysis_type}..."):
-                            # Get analysis prompt
-                            analysis_prompt = ATSAnalyzer.ANALYSIS_TYPES[analysis_type]
-                            
-                            # Get response
-                            response = ATSAnalyzer.get_ai_response(model_choice,analysis_prompt,doc_text,job_description,selected_language)
-                            
-                            if response:
-                                # Use the class method instead of global function
-                                analysis_data = ATSAnalyzer.extract_data_from_response(response)
-                                if analysis_data:
-                                    st.markdown("## 📊 Analysis Results")
-                                    
-                                    # Display analysis results in text format
-                                    st.markdown("### 📝 Detailed Analysis")
-                                    st.markdown(response)
-                    
-                    # Download button for complete analysis
-                    st.download_button("📥 Download Complete Analysis",
-                        "\n\n".join([f"=== {at} ===\n{ATSAnalyzer.get_ai_response(model_choice, ATSAnalyzer.ANALYSIS_TYPES[at], doc_text, job_description, selected_language)}" for at in analysis_types]),
-                        file_name=f"resume_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
-                        mime="text/plain")
+                    translated_from = st.session_state.setdefault("translated_from", {})
+                    # Each module runs as a background job; results land in the store when it finishes
+                    for analysis_type in pending_types:
+                        result_key = result_keys[analysis_type]
+                        speculative_prefetch.claim(speculation, result_key)
+                        # Same documents, module, model and mode in another language
+                        source_key = next((key for key in result_store if translate_results and key[:3] == result_key[:3]
+                            and key[4:] == result_key[4:] and key[3] != selected_language), None)
+                        if source_key:
+                            translated_from[result_key] = source_key[3]
+                            submit_session_job(f"🌐 {analysis_type}", "analysis_results", result_key,
+                                ATSAnalyzer.translate_analysis, model_choice, result_store[source_key], source_key[3],
+                                selected_language, TokenLedger.estimate_tokens(
+                                    ATSAnalyzer.get_prompts(selected_language)["system_msg"] + doc_text + job_description
+                                    + ATSAnalyzer.ANALYSIS_TYPES[analysis_type]))
+                        else:
+                            submit_session_job(f"{analysis_type}", "analysis_results", result_key,
+                                ATSAnalyzer.run_analysis, model_choice, analysis_type, doc_text, job_description,
+                                selected_language, structured_results, sectioned_results)
+
+            # The results area reruns on its own (export picker, polling for jobs) without the inputs and sidebar
+            if st.session_state.get("jobs"):
+                analysis_results_polling_panel(analysis_context, analysis_types, result_keys, selected_language,
+                    model_choice, polling=True)
+            else:
+                analysis_results_panel(analysis_context, analysis_types, result_keys, selected_language, model_choice)
+        elif st.session_state.get("jobs"):
+            job_status_panel()
 
     else:
         # Futuristic Header for Cold Mail Generator
@@ -1332,18 +3731,22 @@ def main():
             job_description = st.text_area(
                 "Job description",
                 height=300,
+                key="cold_mail_job_description",
                 placeholder="Paste the complete job description to generate a tailored cold mail..."
             )
         
         with col2:
             # Resume Upload
             st.markdown("### 📄 Your Resume")
-            uploaded_resume = st.file_uploader("Upload your resume",
+            uploaded_resume = track_upload(st.file_uploader("Upload your resume",
                 type=["pdf", "doc", "docx"],
-                help="Upload your resume to personalize the cold mail")
+                help="Upload your resume to personalize the cold mail"))
             
             if uploaded_resume:
                 st.success(f"✅ Resume uploaded: {uploaded_resume.name}")
+
+        if job_index:
+            job_postings_panel(uploaded_resume, "cold_mail_job_description")
         
         # Cold Mail Type Selection with descriptions
         st.markdown("### 📋 Select Cold Mail Style")
@@ -1351,60 +3754,221 @@ def main():
             list(ATSAnalyzer.COLD_MAIL_TYPES.keys()),
             format_func=lambda x: f"{x} - {ATSAnalyzer.COLD_MAIL_TYPES[x]['description']}")
 
+        # Fields extracted locally from the resume prefill the personal information
+        doc_text = ATSAnalyzer.get_document_text(uploaded_resume) if uploaded_resume else None
+        resume_fields = ATSAnalyzer.get_resume_fields(uploaded_resume) if doc_text else {}
+        degree_and_year = ", ".join(value for value in (resume_fields.get("year"), resume_fields.get("degree")) if value)
+
         # Personal Information
-        with st.expander("✍🏽Enter Your Personal Information (Optional)"):
+        # A form batches edits to all six fields into a single rerun
+        with st.expander("✍🏽Enter Your Personal Information (Optional)"), st.form("personal_info_form", border=False):
             col1, col2 = st.columns(2)
             with col1:
-                name = st.text_input("Your Full Name", placeholder="Your Name")
-                email = st.text_input("Email Address", placeholder="YourName@email.com")
-                university = st.text_input("University/College Name", placeholder="Your University/College Name")
+                name = st.text_input("Your Full Name", value=resume_fields.get("name", ""), placeholder="Your Name")
+                email = st.text_input("Email Address", value=resume_fields.get("email", ""), placeholder="YourName@email.com")
+                university = st.text_input("University/College Name", value=resume_fields.get("university", ""),
+                    placeholder="Your University/College Name")
                 
             with col2:
-                phone = st.text_input("Phone Number", placeholder="98XXXXXXXX")
-                linkedin = st.text_input("LinkedIn Profile URL", placeholder="https://linkedin.com/in/yourusername")
-                degree = st.text_input("Degree & Year", placeholder="3rd Year, B.Sc.Stream")
+                phone = st.text_input("Phone Number", value=resume_fields.get("phone", ""), placeholder="98XXXXXXXX")
+                linkedin = st.text_input("LinkedIn Profile URL", value=resume_fields.get("linkedin", ""),
+                    placeholder="https://linkedin.com/in/yourusername")
+                degree = st.text_input("Degree & Year", value=degree_and_year, placeholder="3rd Year, B.Sc.Stream")
+            st.form_submit_button("💾 Save details", use_container_width=True)
+
+        personal_info = {"name": name,
+            "email": email,
+            "phone": phone,
+            "university": university,
+            "linkedin": linkedin,
+            "degree": degree}
+        # Compact facts keep cold mail prompts small when the resume sections were recognized
+        mail_resume_text = (compact_resume and ATSAnalyzer.format_resume_facts(resume_fields)) or doc_text
+
+        draft_mode = st.radio("Draft mode", ["⚡ Instant local draft", "🤖 AI generated"], horizontal=True,
+            help="Instant drafts fill the template from your resume in milliseconds; AI generation writes the mail from scratch")
+        mail_store = st.session_state.setdefault("cold_mails", {})
+        mail_key = None
+
+        if draft_mode == "⚡ Instant local draft":
+            if uploaded_resume:
+                if doc_text:
+                    facts = ATSAnalyzer.extract_local_facts(doc_text, job_description, resume_fields)
+                    local_draft = ATSAnalyzer.render_local_draft(cold_mail_type, personal_info, facts)
+                    st.markdown("### ⚡ Instant Draft")
+                    draft = st.text_area("Edit your draft, then download it or refine it with AI", local_draft,
+                        height=420, key=f"local_draft_{ATSAnalyzer.hash_text(local_draft)}")
+                    mail_key = (ATSAnalyzer.hash_upload(uploaded_resume), ATSAnalyzer.hash_text(job_description),
+                        "refined", model_choice, ATSAnalyzer.hash_text(draft))
+
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.download_button(label="💾 Download Draft",
+                            data=draft,
+                            file_name=f"cold_mail_draft_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
+                            mime="text/plain",
+                            use_container_width=True)
+                    with col2:
+                        if st.button("✨ Refine with AI", use_container_width=True):
+                            submit_session_job("✨ Draft refinement", "cold_mails", mail_key,
+                                ATSAnalyzer.generate_cold_mail,
+                                model_choice=model_choice,
+                                prompt=ATSAnalyzer.REFINE_DRAFT_PROMPT.format(draft=draft),
+                                resume_text=mail_resume_text,
+                                job_description=job_description,
+                                personal_info=personal_info)
 
         # Generate Button
-        if uploaded_resume and job_description:
+        elif uploaded_resume and job_description:
+            mail_key = (ATSAnalyzer.hash_upload(uploaded_resume), ATSAnalyzer.hash_text(job_description),
+                cold_mail_type, model_choice, ATSAnalyzer.hash_text(json.dumps(personal_info, sort_keys=True)))
+
             if st.button("Generate Cold Mail", use_container_width=True):
-                doc_text = ATSAnalyzer.extract_text(uploaded_resume)
-                
                 if doc_text:
-                    with st.spinner("📨 Crafting your personalized cold mail..."):
-                        # Get the selected template
-                        template = ATSAnalyzer.COLD_MAIL_TYPES[cold_mail_type]["template"]
-                        
-                        # Generate cold mail
-                        cold_mail = ATSAnalyzer.generate_cold_mail(
-                            model_choice=model_choice,
-                            prompt=template,
-                            resume_text=doc_text,
-                            job_description=job_description,
-                            personal_info={"name": name,
-                                "email": email,
-                                "phone": phone,
-                                "university": university,
-                                "linkedin": linkedin,
-                                "degree": degree})
-                        
-                        if cold_mail:
-                            st.markdown("### 📧 Your Generated Cold Mail")
-                            st.markdown('''
-                                <div class="glass-card" style="padding: 2rem; margin-top: 1rem;">
-                                    <pre style="white-space: pre-wrap; word-wrap: break-word;">{}</pre>
-                                </div>
-                            '''.format(cold_mail), unsafe_allow_html=True)
-                            
-                            # Download button
-                            current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
-                            filename = f"cold_mail_{current_time}.txt"
-                            
-                            st.download_button(label="💾 Download Cold Mail",
-                                data=cold_mail,
-                                file_name=filename,
-                                mime="text/plain",
-                                use_container_width=True)
+                    # Get the selected template
+                    template = ATSAnalyzer.COLD_MAIL_TYPES[cold_mail_type]["template"]
+                    
+                    # Generate cold mail in the background
+                    submit_session_job("📨 Cold mail", "cold_mails", mail_key,
+                        ATSAnalyzer.generate_cold_mail,
+                        model_choice=model_choice,
+                        prompt=template,
+                        resume_text=mail_resume_text,
+                        job_description=job_description,
+                        personal_info=personal_info)
+
+        if st.session_state.get("jobs"):
+            job_status_panel()
+
+        cold_mail = mail_store.get(mail_key) if mail_key else None
+        if cold_mail:
+            st.markdown("### 📧 Your Generated Cold Mail")
+            st.markdown('''
+                <div class="glass-card" style="padding: 2rem; margin-top: 1rem;">
+                    <pre style="white-space: pre-wrap; word-wrap: break-word;">{}</pre>
+                </div>
+            '''.format(cold_mail), unsafe_allow_html=True)
+            
+            # Download button
+            current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"cold_mail_{current_time}.txt"
+            
+            st.download_button(label="💾 Download Cold Mail",
+                data=cold_mail,
+                file_name=filename,
+                mime="text/plain",
+                use_container_width=True)
         
+        # Bulk cold mails for a list of target companies
+        with st.expander("📬 Bulk Cold Mails (CSV)"):
+            st.caption("Upload a CSV with the columns: company, recipient_name, role, job_description")
+            bulk_csv = track_upload(st.file_uploader("Target companies CSV", type=["csv"]))
+
+            if bulk_csv and not uploaded_resume:
+                st.info("Upload your resume above to generate bulk cold mails.")
+            elif bulk_csv:
+                bulk_rows = ATSAnalyzer.parse_bulk_csv(bulk_csv.getvalue())
+                bulk_store = st.session_state.setdefault("bulk_cold_mails", {})
+                bulk_key = (ATSAnalyzer.hash_upload(uploaded_resume), ATSAnalyzer.hash_upload(bulk_csv),
+                    cold_mail_type, model_choice, ATSAnalyzer.hash_text(json.dumps(personal_info, sort_keys=True)))
+                st.caption(f"✅ {len(bulk_rows)} companies with a job description found")
+
+                if bulk_rows and st.button("Generate Bulk Cold Mails", use_container_width=True):
+                    if doc_text:
+                        submit_session_job("📬 Bulk cold mails", "bulk_cold_mails", bulk_key,
+                            ATSAnalyzer.run_bulk_cold_mails, model_choice,
+                            ATSAnalyzer.COLD_MAIL_TYPES[cold_mail_type]["template"], mail_resume_text,
+                            bulk_rows, personal_info, int(get_config("SJA_BULK_CONCURRENCY", 4)), progress=True)
+
+                if bulk_key in bulk_store:
+                    bulk_rows, bulk_mails = bulk_store[bulk_key]
+                    failed = sum(1 for mail in bulk_mails if not mail)
+                    if failed:
+                        st.warning(f"⚠️ {failed} cold mails could not be generated.")
+                    csv_data, zip_data = ATSAnalyzer.build_bulk_exports(bulk_rows, bulk_mails)
+                    current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.download_button("🗂️ Download ZIP", data=zip_data, file_name=f"cold_mails_{current_time}.zip",
+                            mime="application/zip", use_container_width=True)
+                    with col2:
+                        st.download_button("📄 Download CSV", data=csv_data, file_name=f"cold_mails_{current_time}.csv",
+                            mime="text/csv", use_container_width=True)
+
+    budget_state = token_ledger.budget_state({"session": session_id()})
+    if budget_state == "exhausted":
+        st.sidebar.warning("🎟️ Token budget used up: analyses show a local keyword estimate and cold mails stay local.")
+    elif budget_state == "light":
+        st.sidebar.info("🎟️ Nearing the token budget: switched to lighter models.")
+
+    # Diagnostics for the process-wide caches, rendered last so they include this run
+    with st.sidebar.expander("📈 Diagnostics"):
+        prefix_stats = prompt_prefix_cache.stats
+        st.caption(f"♻️ Prompt prefix reuse: {prefix_stats['hits']} hits / {prefix_stats['misses']} misses "
+            f"({prompt_prefix_cache.hit_rate:.0%}), {prefix_stats['reused_chars']:,} chars reused, "
+            f"{prefix_stats['provider_cached']} provider context caches")
+        cache_summary = ", ".join(f"{namespace} {cache_backend.hit_rate(namespace):.0%}"
+            f" ({cache_backend.stats.get(namespace, {}).get('evictions', 0)} evicted)"
+            for namespace in CacheBackend.DEFAULT_TTLS)
+        st.caption(f"🗄️ {type(cache_backend).__name__} hit rates: {cache_summary}")
+        st.caption(f"📚 Prompt registry: {len(prompt_registry.hashes)} templates, digest {prompt_registry.digest}")
+        session_usage = token_ledger.by("session").get(session_id())
+        if session_usage:
+            budget = f" of {token_ledger.session_budget:,} budget" if token_ledger.session_budget else ""
+            st.caption(f"🎟️ This session: {token_ledger.used('session', session_id()):,} tokens{budget} in "
+                f"{session_usage['calls']} calls ({session_usage['estimated_calls']} estimated)")
+            for key, usage in token_ledger.by("session_module").items():
+                if key.startswith(f"{session_id()}/"):
+                    st.caption(f"🧩 {key.split('/', 1)[1]}: {usage['input']:,} input / {usage['output']:,} output tokens")
+        for model, usage in token_ledger.by("route").items():
+            st.caption(f"🤖 {model}: {usage['input']:,} input / {usage['output']:,} output tokens in {usage['calls']} calls")
+        for language, usage in token_ledger.by("language").items():
+            st.caption(f"🔤 {language}: {usage['input']:,} input / {usage['output']:,} output tokens in "
+                f"{usage['calls']} calls, {token_ledger.savings.get(language, 0):,} input tokens saved by translation")
+        for route_name, route_stats in model_router.stats.items():
+            average_latency = route_stats["latency"] / route_stats["calls"] if route_stats["calls"] else 0.0
+            average_quality = route_stats["quality"] / route_stats["rated"] if route_stats["rated"] else 0.0
+            st.caption(f"🧭 {route_name}: {route_stats['calls']} calls, {average_latency:.1f}s average latency, "
+                f"{average_quality:.0%} average quality over {route_stats['rated']} rated")
+        memory_usage = session_memory_usage()
+        st.caption(f"💾 Session memory: {sum(memory_usage.values()) / 1024:,.0f} KB "
+            f"(uploads {memory_usage['uploads'] / 1024:,.0f} KB, extracted text {memory_usage['extracted_text'] / 1024:,.0f} KB, "
+            f"results {memory_usage['results'] / 1024:,.0f} KB)")
+        try:
+            import resource
+            # ru_maxrss is reported in kilobytes on Linux
+            st.caption(f"🖥️ Process peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:,.0f} MB")
+        except ImportError:
+            pass
+        if job_index and job_index.stats["searches"]:
+            search_stats = job_index.stats
+            st.caption(f"🔎 Job index: {job_index.size:,} postings, {search_stats['searches']} searches averaging "
+                f"{search_stats['search_ms'] / search_stats['searches']:,.1f} ms")
+        if near_duplicates.stats["lookups"]:
+            st.caption(f"🧬 Near-duplicate reuse: {near_duplicates.stats['hits']} of {near_duplicates.stats['lookups']} "
+                f"analyses ({near_duplicates.hit_rate:.0%}), {len(near_duplicates.entries)} indexed")
+        flight_stats = single_flight.stats
+        st.caption(f"🔗 Coalesced requests: {flight_stats['coalesced']} of "
+            f"{flight_stats['calls'] + flight_stats['coalesced']} ({single_flight.coalescing_rate:.0%})")
+        queue_stats = job_queue.stats()
+        st.caption(f"🧵 Job queue: {queue_stats['queued']} queued, {queue_stats['running']} running on "
+            f"{queue_stats['workers']} workers ({queue_stats['utilization']:.0%} busy now, "
+            f"{queue_stats['busy_ratio']:.0%} since start), {queue_stats['failed']} failed, {queue_stats['shed']} shed")
+        if speculative_prefetch.stats["started"]:
+            prefetch_stats = speculative_prefetch.stats
+            st.caption(f"🔮 Speculative prefetch: {prefetch_stats['hits']} of {prefetch_stats['started']} used "
+                f"({speculative_prefetch.hit_rate:.0%}), {prefetch_stats['cancelled']} cancelled")
+        st.caption("🔁 Reruns: " + ", ".join(f"{entry['count']} {kind} (avg {entry['seconds'] / entry['count'] * 1000:,.0f} ms, "
+            f"max {entry['max_seconds'] * 1000:,.0f} ms)" for kind, entry in rerun_stats.stats.items()))
+        loop_stats = provider_loop.stats
+        st.caption(f"⚡ Provider loop: {loop_stats['in_flight']} in flight (peak {loop_stats['peak_in_flight']} "
+            f"of {provider_loop.max_in_flight}), {loop_stats['calls']} calls, {loop_stats['timeouts']} timeouts, "
+            f"{loop_stats['cancelled']} cancelled")
+        if provider_cassette.mode != "off":
+            cassette_stats = provider_cassette.stats
+            st.caption(f"📼 Cassette: {cassette_stats['recorded']} recorded, {cassette_stats['replayed']} replayed, "
+                f"{cassette_stats['misses']} misses")
+
     # Footer with futuristic style
     st.markdown("---")
     st.markdown("""
@@ -1419,5 +3983,60 @@ def main():
         """,
         unsafe_allow_html=True)
 
+def profiler_allowed():
+    """Admins enable the profiler with SJA_PROFILER, or per browser with ?profile=<SJA_PROFILER_TOKEN>"""
+    if str(get_config("SJA_PROFILER", "")).lower() in ("1", "true", "yes"):
+        return True
+    token = get_config("SJA_PROFILER_TOKEN")
+    return bool(token) and st.query_params.get("profile") == token
+
+def profiler_panel():
+    """Sidebar controls to profile the next rerun and inspect the last profile"""
+    with st.sidebar.expander("🩺 Profiler"):
+        if st.button("Profile next rerun", use_container_width=True):
+            st.session_state["profile_next_rerun"] = True
+            st.rerun()
+        profile = st.session_state.get("last_profile")
+        if profile:
+            st.caption(f"Last profiled rerun: {profile['seconds'] * 1000:,.0f} ms at {profile['taken']}")
+            st.dataframe(profile["rows"], hide_index=True, use_container_width=True)
+            st.download_button("💾 Download .prof", profile["data"],
+                file_name=f"rerun_{profile['taken'].replace(':', '')}.prof", mime="application/octet-stream",
+                help="Open with snakeviz, pstats or any tool that reads cProfile output")
+
+def session_id():
+    """Short random id for this browser session, used to attribute token usage"""
+    return st.session_state.setdefault("session_id", uuid.uuid4().hex[:12])
+
+def run_app():
+    """Run main(), under cProfile only for a rerun an admin asked to profile"""
+    # Uploaders report the files they hold afresh on every run, so cleared or replaced files drop out
+    st.session_state["upload_sizes"] = {}
+    if not st.session_state.pop("profile_next_rerun", False):
+        with rerun_stats.track("app"), accounting_scope(session=session_id()):
+            main()
+        if profiler_allowed():
+            profiler_panel()
+        return
+
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        with rerun_stats.track("app"), accounting_scope(session=session_id()):
+            main()
+    finally:
+        profiler.disable()
+        seconds = time.perf_counter() - start
+        stats = pstats.Stats(profiler)
+        top_functions = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:int(
+            get_config("SJA_PROFILER_TOP", 25))]
+        st.session_state["last_profile"] = {"seconds": seconds, "taken": datetime.now().strftime("%H:%M:%S"),
+            "data": marshal.dumps(stats.stats),
+            "rows": [{"function": f"{function} ({os.path.basename(filename)}:{line})", "calls": calls,
+                "own ms": round(own * 1000, 1), "cumulative ms": round(cumulative * 1000, 1)}
+                for (filename, line, function), (_, calls, own, cumulative, _) in top_functions]}
+    profiler_panel()
+
 if __name__ == "__main__":
-    main()
+    run_app()
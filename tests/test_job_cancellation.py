@@ -0,0 +1,56 @@
+"""Cancelling a running job must work the same on every script run, not just the first"""
+import asyncio
+import os
+import runpy
+import threading
+import time
+from pathlib import Path
+
+import google.generativeai as genai
+import pytest
+
+APP_PATH = Path(__file__).resolve().parent.parent / "app.py"
+
+
+class SlowModel:
+    """Gemini stand-in whose call stays in flight until it is cancelled"""
+    started = threading.Event()
+
+    def __init__(self, name, **kwargs):
+        self.name = name
+
+    async def generate_content_async(self, contents, **kwargs):
+        SlowModel.started.set()
+        await asyncio.sleep(30)
+
+
+@pytest.fixture
+def reruns(monkeypatch):
+    monkeypatch.setenv("Google_Gemini_ai_key", "test")
+    monkeypatch.setattr(genai, "configure", lambda **kwargs: None)
+    monkeypatch.setattr(genai, "GenerativeModel", SlowModel)
+    # Streamlit executes the script in a fresh module on every rerun while cached resources live on
+    return [runpy.run_path(str(APP_PATH), run_name="sja_app") for _ in range(2)]
+
+
+def test_cancel_on_a_later_run_stops_the_job_and_spares_coalesced_callers(reruns):
+    _, run = reruns
+    analyzer, job_queue, single_flight = run["ATSAnalyzer"], run["job_queue"], run["single_flight"]
+    leader = lambda: single_flight.do("speculation", lambda: analyzer.fetch_ai_response(
+        "Google Gemini", "Summarize the fit", "resume " * 50, "job description " * 50))
+    job_id = job_queue.submit("🔮 Complete Analysis", leader)
+    assert SlowModel.started.wait(5)
+
+    results = []
+    follower = threading.Thread(target=lambda: results.append(
+        single_flight.do("speculation", lambda: "own result")))
+    follower.start()
+    time.sleep(0.2)
+    assert job_queue.cancel(job_id)
+    follower.join(5)
+
+    deadline = time.time() + 5
+    while not job_queue.get(job_id)["finished"] and time.time() < deadline:
+        time.sleep(0.05)
+    assert job_queue.get(job_id)["status"] == "cancelled"
+    assert results == ["own result"]